@@ -0,0 +1,54 @@
+import os
+import sys
+from time import perf_counter
+
+from bs4 import BeautifulSoup
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIRECTORY))
+
+import vod_recovery  # noqa: E402
+
+# fixtures/*.html are offline reconstructions of the tracker stream pages around the elements
+# the parsers read, save real pages over them to measure against live markup
+TRACKER_SELECTORS = {
+    "streamscharts.html": [("div", "text-xs font-bold", 4), ("time", "ml-2 font-bold", 1), ("span", "mx-2 font-bold", 1)],
+    "twitchtracker.html": [("div", "g-x-s-value", 1), ("div", "stream-timestamp-dt", 1)],
+    "sullygnome.html": [("div", "MiddleSubHeaderItemValue", 8)],
+}
+
+
+def time_call(function, repeat):
+    start_time = perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (perf_counter() - start_time) / repeat * 1000
+
+
+def extract_with_full_tree(page_content, tag, class_name, count):
+    bs = BeautifulSoup(page_content, "html.parser")
+    return [element.text for element in bs.find_all(tag, {"class": class_name})][:count]
+
+
+def run_benchmark(repeat=20):
+    mismatches = 0
+    for fixture_name, selectors in TRACKER_SELECTORS.items():
+        with open(os.path.join(BENCHMARK_DIRECTORY, "fixtures", fixture_name), "rb") as fixture_file:
+            page_content = fixture_file.read()
+        print(f"\n{fixture_name} ({len(page_content) / 1024:.0f} KB)")
+
+        for tag, class_name, count in selectors:
+            expected_values, tree_ms = time_call(lambda: extract_with_full_tree(page_content, tag, class_name, count), max(1, repeat // 10))
+            values, extract_ms = time_call(lambda: vod_recovery.extract_tracker_values(page_content, tag, class_name, count), repeat)
+            matches = values == expected_values
+            mismatches += not matches
+            print(f"  <{tag} class=\"{class_name}\"> x{count}: full tree {tree_ms:.1f} ms, extract_tracker_values {extract_ms:.2f} ms ({tree_ms / extract_ms:.0f}x) {'same values' if matches else 'MISMATCH'}")
+            if not matches:
+                print(f"    expected {expected_values}\n    got      {values}")
+
+    print(f"\n{mismatches} mismatches")
+    return mismatches
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20) else 0)
@@ -1,23 +1,31 @@
 import hashlib
+import html
+import io
 import json
+import mmap
 import csv
 import os
 import random
 import re
+import shlex
 import subprocess
-import tkinter as tk
 import sys
-from time import sleep
-from shutil import rmtree, copyfileobj
-from datetime import datetime, timedelta
-from tkinter import filedialog
-from urllib.parse import urlparse
+import sqlite3
+import threading
+import weakref
+from time import sleep, perf_counter, time
+from shutil import rmtree, copyfileobj, which
+from functools import wraps
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, urljoin
 from unicodedata import normalize
 import asyncio
-import grequests
+import atexit
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 import aiohttp
-from bs4 import BeautifulSoup
-from seleniumbase import SB
+from aiohttp import web
+from bs4 import BeautifulSoup, SoupStrainer
 import requests
 from packaging import version
 import ffmpeg_downloader as ffdl
@@ -27,6 +35,9 @@ from ffmpeg_progress_yield import FfmpegProgress
 
 CURRENT_VERSION = "1.3.6"
 SUPPORTED_FORMATS = [".mp4", ".mkv", ".mov", ".avi", ".ts"]
+RESOLUTIONS = ["chunked", "1080p60", "1080p30", "720p60", "720p30", "480p60", "480p30"]
+RESOLUTION_CACHE_TTL = 6 * 60 * 60
+RESOLUTION_CACHE_MAX_ENTRIES = 10000
 
 if sys.platform == 'win32':
 	asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -161,6 +172,52 @@ def read_config_file(config_file):
     return config
 
 
+def read_config_by_key(config_file, key):
+    return read_config_file(config_file).get(key)
+
+
+def get_default_directory():
+    default_directory = os.path.expanduser(read_config_by_key("settings", "DEFAULT_DIRECTORY") or "~/Downloads/")
+    os.makedirs(default_directory, exist_ok=True)
+    return default_directory
+
+
+def get_default_video_format():
+    default_video_format = read_config_by_key("settings", "DEFAULT_VIDEO_FORMAT")
+    if default_video_format in SUPPORTED_FORMATS:
+        return default_video_format
+    return ".mp4"
+
+
+def get_default_downloader():
+    default_downloader = read_config_by_key("settings", "DEFAULT_DOWNLOADER")
+    if default_downloader in ("ffmpeg", "yt-dlp"):
+        return default_downloader
+    return "ffmpeg"
+
+
+def get_use_progress_bar():
+    use_progress_bar = read_config_by_key("settings", "USE_PROGRESS_BAR")
+    return True if use_progress_bar is None else bool(use_progress_bar)
+
+
+def get_yt_dlp_custom_options():
+    custom_options = read_config_by_key("settings", "YT_DLP_OPTIONS")
+    return shlex.split(custom_options) if custom_options else []
+
+
+def get_ffmpeg_format(file_extension):
+    ffmpeg_formats = {".mp4": "mp4", ".mkv": "matroska", ".mov": "mov", ".avi": "avi", ".ts": "mpegts"}
+    return ffmpeg_formats.get(file_extension.lower(), "mp4")
+
+
+def get_ffmpeg_path():
+    # the copy installed by ffmpeg_downloader wins over one on PATH, None when neither exists
+    if ffdl.ffmpeg_path and os.path.exists(ffdl.ffmpeg_path):
+        return ffdl.ffmpeg_path
+    return which("ffmpeg")
+
+
 def open_file(file_path):
     if sys.platform.startswith("darwin"):
         subprocess.call(("open", file_path))
@@ -230,6 +287,70 @@ def get_vod_filepath(streamer_name, video_id):
     return vod_filename
 
 
+def get_resolution_cache_filepath():
+    return os.path.join(get_script_directory(), "lib", "resolution_cache.db")
+
+
+resolution_cache_connection = None
+resolution_cache_lock = threading.Lock()
+
+
+def get_resolution_cache():
+    global resolution_cache_connection
+    if resolution_cache_connection is None:
+        connection = sqlite3.connect(get_resolution_cache_filepath(), check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS resolutions ("
+            "video_id TEXT PRIMARY KEY, data TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS resolutions_accessed_at ON resolutions (accessed_at)")
+        connection.commit()
+        resolution_cache_connection = connection
+    return resolution_cache_connection
+
+
+def get_cached_resolution(video_id, ttl=RESOLUTION_CACHE_TTL):
+    try:
+        with resolution_cache_lock:
+            connection = get_resolution_cache()
+            row = connection.execute("SELECT data, created_at FROM resolutions WHERE video_id = ?", (str(video_id),)).fetchone()
+            if row is None:
+                return None
+            with connection:
+                if time() - row[1] > ttl:
+                    connection.execute("DELETE FROM resolutions WHERE video_id = ?", (str(video_id),))
+                    return None
+                connection.execute("UPDATE resolutions SET accessed_at = ? WHERE video_id = ?", (time(), str(video_id)))
+            return json.loads(row[0])
+    except sqlite3.Error:
+        return None
+
+
+def store_resolution(video_id, max_entries=RESOLUTION_CACHE_MAX_ENTRIES, **fields):
+    # merges into the existing entry so qualities/muted status can be added after the url was resolved
+    try:
+        with resolution_cache_lock:
+            connection = get_resolution_cache()
+            row = connection.execute("SELECT data, created_at FROM resolutions WHERE video_id = ?", (str(video_id),)).fetchone()
+            data = json.loads(row[0]) if row else {}
+            data.update(fields)
+            now = time()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO resolutions (video_id, data, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (str(video_id), json.dumps(data), row[1] if row else now, now),
+                )
+                connection.execute(
+                    "DELETE FROM resolutions WHERE video_id IN (SELECT video_id FROM resolutions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,),
+                )
+            return data
+    except sqlite3.Error:
+        return None
+
+
 def get_script_directory():
     return os.path.dirname(os.path.realpath(__file__))
 
@@ -330,26 +451,36 @@ def parse_sullygnome_url(sullygnome_url):
 
 
 def get_m3u8_file_dialog():
+    # tkinter is only needed by the interactive menus, headless installs often lack it
     try:
-        window = tk.Tk()
-        window.wm_attributes("-topmost", 1)
-        window.withdraw()
-        directory = get_default_directory()
-        file_path = filedialog.askopenfilename(
-            parent=window,
-            initialdir=directory,
-            title="Select A File",
-            filetypes=(("M3U8 files", "*.m3u8"), ("All files", "*")),
-        )
-        window.destroy()
-        return file_path
-    except tk.TclError:
-        file_path = input("Enter the full path to the M3U8 file: ").strip(' "\'')
-        while not file_path:
-            return None
-        while not os.path.exists(file_path):
-            file_path = input("File does not exist! Enter a valid path: ").strip(' "\'')
-        return file_path
+        import tkinter as tk
+        from tkinter import filedialog
+    except ImportError:
+        tk = None
+
+    if tk is not None:
+        try:
+            window = tk.Tk()
+            window.wm_attributes("-topmost", 1)
+            window.withdraw()
+            directory = get_default_directory()
+            file_path = filedialog.askopenfilename(
+                parent=window,
+                initialdir=directory,
+                title="Select A File",
+                filetypes=(("M3U8 files", "*.m3u8"), ("All files", "*")),
+            )
+            window.destroy()
+            return file_path
+        except tk.TclError:
+            pass
+
+    file_path = input("Enter the full path to the M3U8 file: ").strip(' "\'')
+    while not file_path:
+        return None
+    while not os.path.exists(file_path):
+        file_path = input("File does not exist! Enter a valid path: ").strip(' "\'')
+    return file_path
 
 
 def parse_vod_filename(m3u8_video_filename):
@@ -413,19 +544,227 @@ def extract_offset(clip_url):
     return clip_offset.group(1)
 
 
+# url template and offset step of each clip format
+CLIP_URL_FORMATS = {
+    "1": ("https://clips-media-assets2.twitch.tv/{video_id}-offset-{offset}.mp4", 2),
+    "2": ("https://clips-media-assets2.twitch.tv/vod-{video_id}-offset-{offset}.mp4", 2),
+    "3": ("https://clips-media-assets2.twitch.tv/{video_id}-index-{offset:010}.mp4", 1),
+}
+CLIP_COARSE_STRIDE = 10
+CLIP_DENSIFY_RADIUS = 60
+
+
+def get_clip_url(video_id, clip_format, offset):
+    url_template, _ = CLIP_URL_FORMATS[clip_format]
+    return url_template.format(video_id=video_id, offset=offset)
+
+
+def get_clip_url_format(clip_url):
+    if "-index-" in clip_url:
+        return "3"
+    if "/vod-" in clip_url:
+        return "2"
+    return "1"
+
+
 def get_clip_format(video_id, offsets):
-    default_clip_list = [f"https://clips-media-assets2.twitch.tv/{video_id}-offset-{i}.mp4" for i in range(0, offsets, 2)]
-    alternate_clip_list = [f"https://clips-media-assets2.twitch.tv/vod-{video_id}-offset-{i}.mp4" for i in range(0, offsets, 2)]
-    legacy_clip_list = [f"https://clips-media-assets2.twitch.tv/{video_id}-index-{i:010}.mp4" for i in range(offsets)]
-
-    clip_format_dict = {
-        "1": default_clip_list,
-        "2": alternate_clip_list,
-        "3": legacy_clip_list,
-    }
+    clip_format_dict = {}
+    for clip_format, (_, offset_step) in CLIP_URL_FORMATS.items():
+        clip_format_dict[clip_format] = [get_clip_url(video_id, clip_format, offset) for offset in range(0, offsets, offset_step)]
     return clip_format_dict
 
 
+def get_clip_checkpoint_filepath(streamer_name, video_id):
+    checkpoint_filename = os.path.join(get_default_directory(), f"{streamer_name}_{video_id}_clips.checkpoint")
+    return checkpoint_filename
+
+
+def read_clip_checkpoint(checkpoint_path, clip_formats, candidate_count):
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+    except (OSError, ValueError):
+        return 0, []
+    # a checkpoint for a different search space cannot be resumed
+    if checkpoint.get("formats") != list(clip_formats) or checkpoint.get("candidates") != candidate_count:
+        return 0, []
+    return checkpoint.get("completed", 0), checkpoint.get("hits", [])
+
+
+def write_clip_checkpoint(checkpoint_path, clip_formats, candidate_count, completed, hits):
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump({"formats": list(clip_formats), "candidates": candidate_count, "completed": completed, "hits": hits}, checkpoint_file)
+    os.replace(temp_path, checkpoint_path)
+
+
+async def download_clip(session, clip_url, output_directory, retries=3):
+    output_path = os.path.join(output_directory, os.path.basename(urlparse(clip_url).path))
+    temp_path = f"{output_path}.part"
+    for attempt in range(retries):
+        try:
+            async with session.get(clip_url) as response:
+                if response.status in (403, 404):
+                    return None
+                response.raise_for_status()
+                with open(temp_path, "wb") as clip_file:
+                    async for chunk in response.content.iter_chunked(1024 * 1024):
+                        clip_file.write(chunk)
+            os.replace(temp_path, output_path)
+            return output_path
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt < retries - 1:
+                await asyncio.sleep(get_backoff_delay(attempt))
+    return None
+
+
+async def probe_clip_urls(clip_urls, checkpoint_path=None, clip_formats=(), max_concurrency=100, download_directory=None, download_workers=4, checkpoint_interval=500):
+    candidate_count = len(clip_urls)
+    completed, hits = 0, []
+    if checkpoint_path:
+        completed, hits = read_clip_checkpoint(checkpoint_path, clip_formats, candidate_count)
+        if completed:
+            print(f"Resuming clip search: {completed} / {candidate_count} urls already checked, {len(hits)} found\n")
+    # hits found past the checked prefix before an interruption are probed again on resume
+    known_hits = set(hits)
+
+    # workers finish out of order, only the contiguous checked prefix is safe to record as done
+    checked = bytearray(candidate_count)
+    clip_indices = iter(range(completed, candidate_count))
+    host_limiters = {}
+    download_tasks = []
+    download_slots = asyncio.Semaphore(download_workers)
+    checked_count = completed
+    since_checkpoint = 0
+
+    def checkpoint():
+        if checkpoint_path:
+            write_clip_checkpoint(checkpoint_path, clip_formats, candidate_count, completed, hits)
+
+    async def download_hit(session, clip_url):
+        async with download_slots:
+            return await download_clip(session, clip_url, download_directory)
+
+    connector = aiohttp.TCPConnector(limit=max_concurrency, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def worker():
+            nonlocal completed, checked_count, since_checkpoint
+            for index in clip_indices:
+                url = clip_urls[index]
+                limiter = host_limiters.setdefault(urlparse(url).netloc, AdaptiveLimiter(initial_limit=32, max_limit=max_concurrency))
+                if await fetch_segment_info(session, url, retries=5, limiter=limiter) and url not in known_hits:
+                    known_hits.add(url)
+                    hits.append(url)
+                    print(f"\n\033[92m✓ Found clip: {url}\033[0m")
+                    if download_directory:
+                        download_tasks.append(asyncio.create_task(download_hit(session, url)))
+                checked[index] = 1
+                while completed < candidate_count and checked[completed]:
+                    completed += 1
+                checked_count += 1
+                since_checkpoint += 1
+                if since_checkpoint >= checkpoint_interval:
+                    since_checkpoint = 0
+                    checkpoint()
+                print(f"\rSearching {checked_count} / {candidate_count} clip urls, {len(hits)} found", end="")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(max_concurrency, candidate_count - completed) or 1)))
+        finally:
+            checkpoint()
+        downloaded_paths = [path for path in await asyncio.gather(*download_tasks) if path]
+
+    print()
+    return {"hits": hits, "downloaded": downloaded_paths}
+
+
+def get_clip_offsets_near(center_offsets, max_offset, offset_step, radius):
+    offsets = set()
+    for center_offset in center_offsets:
+        start_offset = max(0, center_offset - radius) // offset_step * offset_step
+        offsets.update(range(start_offset, min(max_offset, center_offset + radius + 1), offset_step))
+    return offsets
+
+
+async def adaptive_clip_search(video_id, max_offset, clip_formats, known_clips=(), coarse_stride=CLIP_COARSE_STRIDE, radius=CLIP_DENSIFY_RADIUS, download_directory=None):
+    # clips cluster around highlights: sample every coarse_stride seconds plus the neighbourhood
+    # of clips we already know, then keep probing every offset around each new hit until none turn up
+    checked_offsets = {clip_format: set() for clip_format in clip_formats}
+    pending_offsets = {}
+    for clip_format in clip_formats:
+        offset_step = CLIP_URL_FORMATS[clip_format][1]
+        stride = max(offset_step, coarse_stride // offset_step * offset_step)
+        known_offsets = [int(extract_offset(url)) for url in known_clips if get_clip_url_format(url) == clip_format]
+        pending_offsets[clip_format] = set(range(0, max_offset, stride)) | get_clip_offsets_near(known_offsets, max_offset, offset_step, radius)
+
+    hits, downloaded_paths = [], []
+    search_round = 0
+    while True:
+        round_urls = []
+        for clip_format, offsets in pending_offsets.items():
+            for offset in sorted(offsets - checked_offsets[clip_format]):
+                round_urls.append(get_clip_url(video_id, clip_format, offset))
+            checked_offsets[clip_format].update(offsets)
+        if not round_urls:
+            break
+
+        search_round += 1
+        print(f"Search round {search_round}: {len(round_urls)} clip urls")
+        clip_results = await probe_clip_urls(round_urls, download_directory=download_directory)
+        hits.extend(clip_results["hits"])
+        downloaded_paths.extend(clip_results["downloaded"])
+
+        pending_offsets = {}
+        for clip_format in clip_formats:
+            new_offsets = [int(extract_offset(url)) for url in clip_results["hits"] if get_clip_url_format(url) == clip_format]
+            pending_offsets[clip_format] = get_clip_offsets_near(new_offsets, max_offset, CLIP_URL_FORMATS[clip_format][1], radius)
+
+    requests_sent = sum(len(offsets) for offsets in checked_offsets.values())
+    return {"hits": hits, "downloaded": downloaded_paths, "requests_sent": requests_sent}
+
+
+def clip_recover(streamer_name, video_id, duration, clip_formats=("1", "2", "3")):
+    print("\nSearching for clips...")
+    max_offset = calculate_max_clip_offset(duration)
+    log_filepath = get_log_filepath(streamer_name, video_id)
+    known_clips = read_text_file(log_filepath) if os.path.exists(log_filepath) else []
+    checkpoint_path = get_clip_checkpoint_filepath(streamer_name, video_id)
+    download_directory = get_default_directory() if read_config_by_key("settings", "AUTO_DOWNLOAD_CLIPS") else None
+
+    start_time = perf_counter()
+    clip_results, requests_sent = None, 0
+    # sampling only sees clips on a multiple of CLIP_COARSE_STRIDE or near one that was found,
+    # so it is opt-in and an empty result still gets the full scan
+    if read_config_by_key("settings", "CLIP_SEARCH_MODE") == "sampled_lossy":
+        clip_results = asyncio.run(adaptive_clip_search(video_id, max_offset, clip_formats, known_clips, download_directory=download_directory))
+        requests_sent = clip_results["requests_sent"]
+        if not clip_results["hits"]:
+            print("No clips found by sampling, falling back to an exhaustive search...")
+            clip_results = None
+    if clip_results is None:
+        clip_format_dict = get_clip_format(video_id, max_offset)
+        clip_urls = [url for clip_format in clip_formats for url in clip_format_dict[clip_format]]
+        clip_results = asyncio.run(probe_clip_urls(clip_urls, checkpoint_path, clip_formats, download_directory=download_directory))
+        requests_sent += len(clip_urls)
+    found_clips = clip_results["hits"]
+
+    print(f"Checked {requests_sent} clip urls in {perf_counter() - start_time:.1f} seconds")
+    if not found_clips:
+        print("No clips found! Returning to main menu.\n")
+    else:
+        for clip_url in sorted(set(found_clips) - set(known_clips), key=lambda url: int(extract_offset(url))):
+            write_text_file(clip_url, log_filepath)
+        print(f"\n\033[92m✓ {len(found_clips)} clips found! Urls saved to {log_filepath}\033[0m")
+        if clip_results["downloaded"]:
+            print(f"\033[92m✓ Downloaded {len(clip_results['downloaded'])} clips to {download_directory}\033[0m")
+
+    # the search completed, a later run for this vod should start from scratch
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return found_clips
+
+
 def get_random_clip_information():
     while True:
         url = get_websites_tracker_url()
@@ -535,73 +874,541 @@ def manual_vod_recover():
     m3u8_source = process_m3u8_configuration(m3u8_link)
     handle_download_menu(m3u8_source)
 
-async def fetch_status(session, url, retries=3, timeout=30):
+class AdaptiveLimiter:
+    # AIMD: +1 slot per window of fast successes, halve on throttling (429/503/timeouts)
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=64, latency_target=2.0):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.successes = 0
+        self.last_decrease = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, throttled, latency):
+        async with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                # requests already in flight when throttling started all fail together, count them once
+                if perf_counter() - self.last_decrease > self.latency_target:
+                    self.limit = max(self.min_limit, self.limit // 2)
+                    self.last_decrease = perf_counter()
+                self.successes = 0
+            elif latency <= self.latency_target:
+                self.successes += 1
+                if self.successes >= self.limit:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self.successes = 0
+            self.condition.notify_all()
+
+
+def get_backoff_delay(attempt, base_delay=0.5, max_delay=30):
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+async def fetch_status(session, url, retries=3, timeout=30, limiter=None):
+    segment_info = await fetch_segment_info(session, url, retries, timeout, limiter)
+    return url if segment_info else None
+
+
+# hosts that answered HEAD with 405/501, checked with a one byte range GET from then on
+head_unsupported_hosts = set()
+
+
+async def request_segment_head(session, url, timeout):
+    host = urlparse(url).netloc
+    if host not in head_unsupported_hosts:
+        async with session.head(url, timeout=timeout, allow_redirects=True) as response:
+            if response.status not in (405, 501):
+                return response.status, response.content_length
+            head_unsupported_hosts.add(host)
+
+    async with session.get(url, timeout=timeout, headers={"Range": "bytes=0-0"}) as response:
+        size = response.content_length
+        content_range = response.headers.get("Content-Range", "")
+        if "/" in content_range and content_range.rsplit("/", 1)[1].isdigit():
+            size = int(content_range.rsplit("/", 1)[1])
+        # a 206 proves the segment exists as much as a 200 does, the body is a single byte
+        status = 200 if response.status == 206 else response.status
+        return status, size
+
+
+async def fetch_segment_info(session, url, retries=3, timeout=30, limiter=None):
     for attempt in range(retries):
+        status, size = None, None
+        if limiter:
+            await limiter.acquire()
+        start_time = perf_counter()
         try:
-            async with session.get(url, timeout=timeout) as response:
-                if response.status == 200:
-                    return url
+            status, size = await request_segment_head(session, url, timeout)
         except (aiohttp.ClientError, asyncio.TimeoutError):
-            if attempt < retries - 1:
-                await asyncio.sleep(2)
+            pass
+        finally:
+            throttled = status is None or status in (429, 503)
+            if limiter:
+                await limiter.release(throttled, perf_counter() - start_time)
+
+        if status == 200:
+            return {"url": url, "size": size}
+        if not throttled:
+            return None
+        if attempt < retries - 1:
+            await asyncio.sleep(get_backoff_delay(attempt))
     return None
 
 
-async def get_vod_urls(streamer_name, video_id, start_timestamp):
-    m3u8_link_list = []
-    script_dir = get_script_directory()
-    domains = read_text_file(os.path.join(script_dir, "lib", "domains.txt"))
+def get_hit_rates_filepath():
+    return os.path.join(get_script_directory(), "lib", "hit_rates.json")
+
+
+def read_hit_rates():
+    try:
+        with open(get_hit_rates_filepath(), "r", encoding="utf-8") as hit_rates_file:
+            hit_rates = json.load(hit_rates_file)
+    except (OSError, ValueError):
+        hit_rates = {}
+    hit_rates.setdefault("domains", {})
+    hit_rates.setdefault("offsets", {})
+    return hit_rates
+
+
+def write_hit_rates(hit_rates):
+    hit_rates_path = get_hit_rates_filepath()
+    temp_path = f"{hit_rates_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as hit_rates_file:
+        json.dump(hit_rates, hit_rates_file, indent=4)
+    os.replace(temp_path, hit_rates_path)
+
+
+def record_vod_hit(m3u8_link, start_timestamp):
+    # m3u8 path looks like /{hash}_{streamer}_{video_id}_{epoch}/{quality}/index-dvr.m3u8
+    parsed_url = urlparse(m3u8_link)
+    domain = f"{parsed_url.scheme}://{parsed_url.netloc}/"
+    start_epoch = calculate_epoch_timestamp(start_timestamp, 0)
+    try:
+        vod_epoch = int(parsed_url.path.strip("/").split("/")[0].rsplit("_", 1)[1])
+    except (IndexError, ValueError):
+        return
+    if start_epoch is None:
+        return
+
+    offset = str(vod_epoch - int(start_epoch))
+    hit_rates = read_hit_rates()
+    hit_rates["domains"][domain] = hit_rates["domains"].get(domain, 0) + 1
+    hit_rates["offsets"][offset] = hit_rates["offsets"].get(offset, 0) + 1
+    try:
+        write_hit_rates(hit_rates)
+    except OSError:
+        pass
+
+
+def rank_candidates(domains, offsets, hit_rates):
+    domain_hits = hit_rates["domains"]
+    offset_hits = hit_rates["offsets"]
+    candidates = [(seconds, domain) for seconds in offsets for domain in domains]
+    # add-one smoothing keeps unseen domains/offsets in play, sorted() is stable so ties keep file order
+    return sorted(
+        candidates,
+        key=lambda candidate: (offset_hits.get(str(candidate[0]), 0) + 1) * (domain_hits.get(candidate[1], 0) + 1),
+        reverse=True,
+    )
+
+
+async def probe_m3u8_urls(m3u8_links, session=None, max_concurrency=100, per_host_limit=20, timeout=10, max_requests=None):
+    # m3u8_links may be a lazy iterator, workers pull candidates from it as they free up
+    stats = {"requests_sent": 0, "time_to_first_hit": None, "elapsed": 0}
+    candidate_iterator = iter(m3u8_links)
+    start_time = perf_counter()
+    successful_urls = []
+
+    async def worker():
+        for url in candidate_iterator:
+            if max_requests is not None and stats["requests_sent"] >= max_requests:
+                return
+            stats["requests_sent"] += 1
+            if await fetch_status(session, url, retries=1, timeout=timeout):
+                successful_urls.append(url)
+                stats["time_to_first_hit"] = perf_counter() - start_time
+                return
+
+    owns_session = session is None
+    if owns_session:
+        connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=per_host_limit, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(max_concurrency)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            await task
+            if successful_urls:
+                break
+    finally:
+        # first hit wins, drop every request still in flight
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if owns_session:
+            await session.close()
+
+    stats["elapsed"] = perf_counter() - start_time
+    return (successful_urls[0] if successful_urls else None), stats
+
+
+def read_vod_domains():
+    domains = read_text_file(os.path.join(get_script_directory(), "lib", "domains.txt"))
+    return [domain.strip() for domain in domains if domain.strip()]
+
+
+def generate_vod_candidate_urls(streamer_name, video_id, start_timestamp, offsets=range(60), domains=None, hit_rates=None, probed=None):
+    # the timestamp is parsed once and the sha1 state of the constant prefix is reused,
+    # each offset then costs one copy + update and is shared by every domain.
+    # probed collects (epoch, domain) pairs, candidates already in it are skipped
+    start_epoch = calculate_epoch_timestamp(start_timestamp, 0)
+    if start_epoch is None:
+        return
+    start_epoch = int(start_epoch)
+    domains = read_vod_domains() if domains is None else domains
+    hit_rates = read_hit_rates() if hit_rates is None else hit_rates
+
+    hash_prefix = hashlib.sha1(f"{streamer_name}_{video_id}_".encode("utf-8"))
+    vod_paths = {}
+    for seconds, domain in rank_candidates(domains, offsets, hit_rates):
+        if probed is not None:
+            if (start_epoch + seconds, domain) in probed:
+                continue
+            probed.add((start_epoch + seconds, domain))
+        vod_path = vod_paths.get(seconds)
+        if vod_path is None:
+            epoch = str(start_epoch + seconds)
+            epoch_hash = hash_prefix.copy()
+            epoch_hash.update(epoch.encode("utf-8"))
+            vod_path = vod_paths[seconds] = f"{epoch_hash.hexdigest()[:20]}_{streamer_name}_{video_id}_{epoch}"
+        yield f"{domain}{vod_path}/chunked/index-dvr.m3u8"
+
+
+def get_search_rings(ring_seconds):
+    # ring n covers the offsets within ±ring_seconds[n] that earlier rings did not,
+    # nearest offsets first and later-than-reported before earlier-than-reported
+    previous_seconds = -1
+    for seconds in ring_seconds:
+        yield sorted(
+            (offset for offset in range(-seconds, seconds + 1) if abs(offset) > previous_seconds),
+            key=lambda offset: (abs(offset), offset < 0),
+        )
+        previous_seconds = max(previous_seconds, seconds)
+
+
+async def search_vod_url(streamer_name, video_id, start_timestamp, session=None, ring_seconds=None, max_requests=None, on_ring=None, probed=None):
+    # searches that share probed also share max_requests, the budget counts every candidate in it
+    ring_seconds = ring_seconds or read_config_by_key("settings", "SEARCH_WINDOW_RINGS") or [60]
+    max_requests = max_requests or read_config_by_key("settings", "PROBE_REQUEST_BUDGET")
+    probed = set() if probed is None else probed
+    stats = {"requests_sent": 0, "time_to_first_hit": None, "elapsed": 0, "ring_seconds": None, "budget_exhausted": False}
+    domains = read_vod_domains()
+    hit_rates = read_hit_rates()
+    start_time = perf_counter()
+    successful_url = None
+
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300))
+
+    def within_budget(m3u8_links):
+        # checked per candidate so concurrent searches on the same probed set stop together,
+        # the candidate that overruns the budget is recorded but never requested
+        for m3u8_link in m3u8_links:
+            if max_requests is not None and len(probed) > max_requests:
+                return
+            yield m3u8_link
+
+    try:
+        for seconds, offsets in zip(ring_seconds, get_search_rings(ring_seconds)):
+            if max_requests is not None and len(probed) >= max_requests:
+                break
+            if on_ring:
+                on_ring(seconds)
+            m3u8_links = generate_vod_candidate_urls(streamer_name, video_id, start_timestamp, offsets, domains, hit_rates, probed)
+            successful_url, ring_stats = await probe_m3u8_urls(within_budget(m3u8_links), session=session)
+            stats["requests_sent"] += ring_stats["requests_sent"]
+            stats["ring_seconds"] = seconds
+            if successful_url:
+                stats["time_to_first_hit"] = perf_counter() - start_time
+                break
+    finally:
+        if owns_session:
+            await session.close()
+
+    stats["budget_exhausted"] = not successful_url and max_requests is not None and len(probed) >= max_requests
+    stats["elapsed"] = perf_counter() - start_time
+    return successful_url, stats
+
 
+async def get_vod_urls(streamer_name, video_id, start_timestamp, return_stats=False, session=None, ring_seconds=None, max_requests=None, probed=None):
     print("\nSearching for M3U8 URL...")
 
-    m3u8_link_list = [
-        f"{domain.strip()}{str(hashlib.sha1(f'{streamer_name}_{video_id}_{int(calculate_epoch_timestamp(start_timestamp, seconds))}'.encode('utf-8')).hexdigest())[:20]}_{streamer_name}_{video_id}_{int(calculate_epoch_timestamp(start_timestamp, seconds))}/chunked/index-dvr.m3u8"
-        for seconds in range(60)
-        for domain in domains if domain.strip()
-    ]
+    def print_ring(seconds):
+        print(f"Probing timestamps within \u00b1{timedelta(seconds=seconds)}...")
 
-    print("\n".join(m3u8_link_list))
-    print("\nExiting process...")
+    successful_url, stats = await search_vod_url(streamer_name, video_id, start_timestamp, session, ring_seconds, max_requests, print_ring, probed)
 
-    sys.exit(0) # early exit because that's all we need
+    if successful_url:
+        print(f"\n\033[92m\u2713 Found M3U8 URL after {stats['requests_sent']} requests in {stats['time_to_first_hit']:.2f}s\033[0m")
+    elif stats["budget_exhausted"]:
+        print(f"\nNo M3U8 URL found, request budget exhausted after {stats['requests_sent']} requests in {stats['elapsed']:.2f}s")
+    else:
+        print(f"\nNo M3U8 URL found after {stats['requests_sent']} requests in {stats['elapsed']:.2f}s")
 
+    if return_stats:
+        return successful_url, stats
     return successful_url
 
 
-def return_supported_qualities(m3u8_link):
+def read_batch_manifest(manifest_path):
+    manifest_rows = []
+    if manifest_path.lower().endswith((".jsonl", ".json")):
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            for line in manifest_file:
+                if line.strip():
+                    manifest_rows.append(json.loads(line))
+        return manifest_rows
+
+    csv_rows = [row for row in read_csv_file(manifest_path) if any(cell.strip() for cell in row)]
+    if not csv_rows:
+        return manifest_rows
+
+    header = [cell.strip().lower() for cell in csv_rows[0]]
+    if "video_id" in header:
+        columns, csv_rows = header, csv_rows[1:]
+    elif len(csv_rows[0]) == 2:
+        columns = ["video_id", "timestamp"]
+    else:
+        columns = ["streamer", "video_id", "timestamp"]
+
+    # SullyGnome style exports only carry the streamer in the filename
+    default_streamer = parse_streamer_from_csv_filename(manifest_path)
+    for row in csv_rows:
+        manifest_row = dict(zip(columns, (cell.strip() for cell in row)))
+        manifest_row.setdefault("streamer", default_streamer)
+        manifest_rows.append(manifest_row)
+    return manifest_rows
+
+
+async def recover_manifest_row(session, row_index, manifest_row):
+    streamer_name = str(manifest_row.get("streamer") or "").strip().lower()
+    video_id = str(manifest_row.get("video_id") or "").strip()
+    timestamp = str(manifest_row.get("timestamp") or "").strip()
+    result = {"row": row_index, "streamer": streamer_name, "video_id": video_id, "timestamp": timestamp}
+
+    if not video_id or (timestamp and (not streamer_name or calculate_epoch_timestamp(timestamp, 0) is None)):
+        result["status"] = "invalid"
+        return result
+
+    cached_resolution = get_cached_resolution(video_id) or {}
+    if cached_resolution.get("m3u8_link"):
+        result.update({"status": "found", "m3u8_link": cached_resolution["m3u8_link"], "requests_sent": 0, "elapsed": 0, "cached": True})
+        return result
+
+    # rows without a timestamp can only be vods still listed on Twitch, rows sharing
+    # the session are looked up together in batched GQL queries
+    if not timestamp:
+        try:
+            resolution = await lookup_vod_resolution(video_id, session=session)
+            result.update({"status": "found", "m3u8_link": resolution["m3u8_link"], "requests_sent": 0})
+        except VodNotFoundError:
+            result["status"] = "not_found"
+        except Exception as error:
+            result.update({"status": "error", "error": str(error)})
+        return result
+
+    try:
+        m3u8_link, stats = await search_vod_url(streamer_name, video_id, timestamp, session=session)
+    except Exception as error:
+        result.update({"status": "error", "error": str(error)})
+        return result
+
+    result.update({"status": "found" if m3u8_link else "not_found", "m3u8_link": m3u8_link, "requests_sent": stats["requests_sent"], "ring_seconds": stats["ring_seconds"], "elapsed": round(stats["elapsed"], 3)})
+    if m3u8_link:
+        record_vod_hit(m3u8_link, timestamp)
+        store_resolution(video_id, m3u8_link=m3u8_link, streamer=streamer_name, timestamp=timestamp)
+    return result
+
+
+async def batch_vod_recover(manifest_path, output_path=None, concurrency=None):
+    manifest_rows = read_batch_manifest(manifest_path)
+    if output_path is None:
+        manifest_name = os.path.splitext(os.path.basename(manifest_path))[0]
+        output_path = os.path.join(get_default_directory(), f"{manifest_name}_results.jsonl")
+    concurrency = concurrency or read_config_by_key("settings", "BATCH_CONCURRENCY") or 10
+
+    pending_rows = asyncio.Queue()
+    for row_index, manifest_row in enumerate(manifest_rows):
+        pending_rows.put_nowait((row_index, manifest_row))
+
+    status_counts = {}
+    connector = aiohttp.TCPConnector(limit=concurrency * 20, limit_per_host=concurrency * 5, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # every run writes one result per manifest row, re-running a manifest replaces the old results
+        with open(output_path, "w", encoding="utf-8") as output_file:
+
+            async def worker():
+                while not pending_rows.empty():
+                    row_index, manifest_row = pending_rows.get_nowait()
+                    result = await recover_manifest_row(session, row_index, manifest_row)
+                    status_counts[result["status"]] = status_counts.get(result["status"], 0) + 1
+                    output_file.write(json.dumps(result) + "\n")
+                    output_file.flush()
+                    print(f"\rRecovered {sum(status_counts.values())} / {len(manifest_rows)}", end="")
+
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, len(manifest_rows)) or 1)))
+
+    print(f"\n\n{', '.join(f'{count} {status}' for status, count in status_counts.items())}")
+    print(f"Results written to {os.path.normpath(output_path)}")
+    return output_path
+
+
+# variant playlists fetched while probing qualities, reused when the chosen one is processed
+variant_playlists = {}
+MAX_VARIANT_PLAYLISTS = 32
+
+
+async def fetch_variant_playlist(session, variant_link, timeout=10):
+    try:
+        async with session.get(variant_link, timeout=timeout) as response:
+            if response.status != 200:
+                return None
+            playlist_data = await response.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+
+    segment_table = parse_m3u8_stream(playlist_data)
+    if not len(segment_table):
+        return None
+
+    variant_playlists[variant_link] = playlist_data
+    while len(variant_playlists) > MAX_VARIANT_PLAYLISTS:
+        variant_playlists.pop(next(iter(variant_playlists)))
+
+    # bitrate from the first segment that is not muted, HEAD gives its size without downloading it
+    bitrate = None
+    if 0 in segment_table.muted:
+        index = segment_table.muted.index(0)
+        segment_info = await fetch_segment_info(session, urljoin(variant_link, segment_table.segment_uri(playlist_data, index)), retries=1, timeout=timeout)
+        if segment_info and segment_info["size"] and segment_table.durations[index]:
+            bitrate = segment_info["size"] * 8 / segment_table.durations[index]
+
+    return {"m3u8_link": variant_link, "duration": segment_table.total_duration, "segments": len(segment_table), "bitrate": bitrate}
+
+
+async def probe_supported_qualities(m3u8_link, session=None):
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit_per_host=len(RESOLUTIONS) * 2))
+    try:
+        variants = await asyncio.gather(*(fetch_variant_playlist(session, m3u8_link.replace("chunked", resolution)) for resolution in RESOLUTIONS))
+    finally:
+        if owns_session:
+            await session.close()
+    return {resolution: variant for resolution, variant in zip(RESOLUTIONS, variants) if variant}
+
+
+async def recover_vod_playlist(streamer_name, video_id, timestamp, probed=None):
+    # url probing and quality probing share one session and connection pool
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        m3u8_link = await get_vod_urls(streamer_name, video_id, timestamp, session=session, probed=probed)
+        if m3u8_link is None:
+            return None, None
+        print("\nChecking for available qualities...")
+        return m3u8_link, await probe_supported_qualities(m3u8_link, session=session)
+
+
+async def recover_vod_playlist_from_trackers(streamer_name, video_id, tracker_lookups, all_timestamps, probed=None):
+    # trackers are scraped in threads, each new timestamp starts its own search as soon as its
+    # tracker answers and the first hit cancels every scrape and search still running
+    executor = ThreadPoolExecutor(max_workers=len(tracker_lookups) or 1)
+    loop = asyncio.get_running_loop()
+    scrape_tasks = {asyncio.ensure_future(loop.run_in_executor(executor, parse_datetime, website)) for parse_datetime, website in tracker_lookups}
+    search_timestamps = {}
+    pending_tasks = set(scrape_tasks)
+    m3u8_link = None
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        try:
+            while pending_tasks and not m3u8_link:
+                done_tasks, pending_tasks = await asyncio.wait(pending_tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done_tasks:
+                    if task in scrape_tasks:
+                        try:
+                            parsed_timestamp, _ = task.result()
+                        except Exception:
+                            continue
+                        if parsed_timestamp and parsed_timestamp not in all_timestamps:
+                            all_timestamps.append(parsed_timestamp)
+                            search_task = asyncio.create_task(get_vod_urls(streamer_name, video_id, parsed_timestamp, session=session, probed=probed))
+                            search_timestamps[search_task] = parsed_timestamp
+                            pending_tasks.add(search_task)
+                    elif task.result():
+                        m3u8_link = task.result()
+                        timestamp = search_timestamps[task]
+                        break
+        finally:
+            for task in pending_tasks:
+                task.cancel()
+            await asyncio.gather(*pending_tasks, return_exceptions=True)
+            # don't wait on trackers that are still loading once the vod is found
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if m3u8_link is None:
+            return None, None, None
+        print("\nChecking for available qualities...")
+        return m3u8_link, timestamp, await probe_supported_qualities(m3u8_link, session=session)
+
+
+def format_quality_option(resolution, variant):
+    label = resolution.replace("chunked", "Chunked (Best Quality)")
+    details = []
+    if variant and variant.get("bitrate"):
+        details.append(f"{variant['bitrate'] / 1_000_000:.1f} Mbps")
+    if variant and variant.get("duration"):
+        details.append(str(timedelta(seconds=int(variant["duration"]))))
+    return f"{label} ({', '.join(details)})" if details else label
+
+
+def return_supported_qualities(m3u8_link, qualities=None):
     if m3u8_link is None:
         return None
     
-    if "chunked" in m3u8_link:
+    # only chunked links can be swapped for another quality
+    if "chunked" not in m3u8_link:
         return m3u8_link
 
-    print("\nChecking for available qualities...")
-    resolutions = ["chunked", "1080p60", "1080p30", "720p60", "720p30", "480p60", "480p30"]
-    request_list = [
-        grequests.get(m3u8_link.replace("chunked", resolution))
-        for resolution in resolutions
-    ]
-    responses = grequests.map(request_list)
-    valid_resolutions = [
-        resolution
-        for resolution, response in zip(resolutions, responses)
-        if response and response.status_code == 200
-    ]
-
+    video_id = parse_video_id_from_m3u8_link(m3u8_link)
+    cached_resolution = get_cached_resolution(video_id) or {}
+    if qualities is None and cached_resolution.get("m3u8_link") == m3u8_link and cached_resolution.get("qualities"):
+        qualities = {resolution: None for resolution in cached_resolution["qualities"]}
+    elif qualities is None:
+        print("\nChecking for available qualities...")
+        qualities = asyncio.run(probe_supported_qualities(m3u8_link))
+    if qualities:
+        store_resolution(video_id, m3u8_link=m3u8_link, qualities=list(qualities))
+
+    valid_resolutions = sorted(qualities, key=RESOLUTIONS.index)
+    # probing can fail on transient errors, the url that was found is still worth returning
     if not valid_resolutions:
-        return None
-
-    valid_resolutions.sort(key=resolutions.index)
+        return m3u8_link
 
-    if always_best_quality:
+    if read_config_by_key("settings", "ALWAYS_BEST_QUALITY"):
         return m3u8_link.replace("chunked", valid_resolutions[0])
 
     print("\nQuality Options:")
     for idx, resolution in enumerate(valid_resolutions, 1):
-        if "chunked" in resolution:
-            print(f"{idx}. {resolution.replace('chunked', 'Chunked (Best Quality)')}")
-        else:
-            print(f"{idx}. {resolution}")
+        print(f"{idx}. {format_quality_option(resolution, qualities[resolution])}")
 
     user_option = get_user_resolution_choice(m3u8_link, valid_resolutions)
     return user_option
@@ -652,34 +1459,245 @@ def handle_cloudflare(sb):
         sb.uc_gui_handle_captcha()
     except Exception:
         pass
-    finally:
+
+
+class BrowserPool:
+    # keeps SeleniumBase browsers alive between scrapes and remembers the cookies
+    # each site handed out after its Cloudflare check, so plain requests can reuse them
+    def __init__(self, size=1, idle_timeout=300):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.idle_browsers = []
+        self.browser_count = 0
+        self.site_sessions = {}
+        self.condition = threading.Condition()
+        self.reaper = None
+
+    def acquire(self):
+        with self.condition:
+            while not self.idle_browsers and self.browser_count >= self.size:
+                self.condition.wait()
+            if self.idle_browsers:
+                browser_context, sb, _ = self.idle_browsers.pop()
+                return browser_context, sb
+            self.browser_count += 1
+
+        try:
+            # seleniumbase is heavy to import and only needed once a tracker page needs a browser
+            from seleniumbase import SB
+
+            browser_context = SB(uc=True)
+            sb = browser_context.__enter__()
+        except Exception:
+            with self.condition:
+                self.browser_count -= 1
+                self.condition.notify()
+            raise
+        self.start_reaper()
+        return browser_context, sb
+
+    def release(self, browser, broken=False):
+        if broken:
+            self.close_browser(browser)
+            return
+        with self.condition:
+            self.idle_browsers.append((*browser, perf_counter()))
+            self.condition.notify()
+
+    def close_browser(self, browser):
+        try:
+            browser[0].__exit__(None, None, None)
+        except Exception:
+            pass
+        with self.condition:
+            self.browser_count -= 1
+            self.condition.notify()
+
+    def close_idle_browsers(self, idle_timeout):
+        with self.condition:
+            expired_browsers = [browser for browser in self.idle_browsers if perf_counter() - browser[2] >= idle_timeout]
+            self.idle_browsers = [browser for browser in self.idle_browsers if browser not in expired_browsers]
+        for browser_context, sb, _ in expired_browsers:
+            self.close_browser((browser_context, sb))
+
+    def start_reaper(self):
+        if self.reaper is not None:
+            return
+
+        def reap():
+            while True:
+                sleep(max(self.idle_timeout / 2, 1))
+                self.close_idle_browsers(self.idle_timeout)
+
+        self.reaper = threading.Thread(target=reap, daemon=True)
+        self.reaper.start()
+
+    def close(self):
+        self.close_idle_browsers(0)
         # delete folder generated by selenium browser
         if os.path.exists("downloaded_files"):
-            rmtree("downloaded_files")
+            rmtree("downloaded_files", ignore_errors=True)
+
+    def get_site_session(self, url):
+        return self.site_sessions.get(urlparse(url).netloc)
+
+    def fetch_page(self, url):
+        browser = self.acquire()
+        sb = browser[1]
+        try:
+            sb.uc_open_with_reconnect(url, reconnect_time=3)
+            handle_cloudflare(sb)
+            page_source = sb.driver.page_source
+            self.site_sessions[urlparse(url).netloc] = {
+                "cookies": {cookie["name"]: cookie["value"] for cookie in sb.driver.get_cookies()},
+                "user_agent": sb.driver.execute_script("return navigator.userAgent"),
+            }
+        except Exception:
+            self.release(browser, broken=True)
+            raise
+        self.release(browser)
+        return page_source
+
+
+browser_pool = None
+browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    global browser_pool
+    with browser_pool_lock:
+        if browser_pool is None:
+            # one browser per tracker, vod_recover looks all three up in parallel
+            browser_pool = BrowserPool(
+                size=read_config_by_key("settings", "BROWSER_POOL_SIZE") or 3,
+                idle_timeout=read_config_by_key("settings", "BROWSER_IDLE_TIMEOUT") or 300,
+            )
+            atexit.register(browser_pool.close)
+    return browser_pool
+
+
+TRACKER_PAGE_TTL = 300
+# tracker url -> page content and validators, shared by every parse_* call of the session
+tracker_pages = {}
+tracker_results = {}
+tracker_pages_lock = threading.Lock()
+
+
+def fetch_tracker_page(tracker_url, website_name):
+    with tracker_pages_lock:
+        cached_page = tracker_pages.get(tracker_url)
+    if cached_page and time() - cached_page["fetched_at"] < TRACKER_PAGE_TTL:
+        return cached_page["content"], cached_page["from_browser"]
+
+    # Method 1: Using requests, with the cookies and user agent of a solved browser session if there is one
+    pool = get_browser_pool()
+    site_session = pool.get_site_session(tracker_url)
+    if site_session:
+        headers, cookies = {"user-agent": site_session["user_agent"]}, site_session["cookies"]
+    else:
+        headers, cookies = return_user_agent(), None
+    if cached_page and cached_page["etag"]:
+        headers["If-None-Match"] = cached_page["etag"]
+    if cached_page and cached_page["last_modified"]:
+        headers["If-Modified-Since"] = cached_page["last_modified"]
+
+    response = requests.get(tracker_url, headers=headers, cookies=cookies, timeout=10)
+    if response.status_code == 304 and cached_page:
+        cached_page["fetched_at"] = time()
+        return cached_page["content"], cached_page["from_browser"]
+
+    if response.status_code == 200:
+        content, from_browser = response.content, False
+    else:
+        # Method 2: Using Selenium
+        print(f"Opening {website_name} with browser...")
+        content, from_browser = pool.fetch_page(tracker_url).encode("utf-8"), True
+
+    with tracker_pages_lock:
+        tracker_pages[tracker_url] = {
+            "content": content,
+            "from_browser": from_browser,
+            "etag": None if from_browser else response.headers.get("ETag"),
+            "last_modified": None if from_browser else response.headers.get("Last-Modified"),
+            "fetched_at": time(),
+        }
+    return content, from_browser
+
+
+tracker_value_patterns = {}
+HTML_TAG_PATTERN = re.compile(rb"<[^>]+>")
+
+
+def get_tracker_value_pattern(tag, class_name):
+    pattern = tracker_value_patterns.get((tag, class_name))
+    if pattern is None:
+        # as for BeautifulSoup, a single class has to be one whitespace separated token of the attribute
+        # and several classes have to be the whole attribute, with any run of whitespace between them
+        class_words = class_name.split()
+        if len(class_words) == 1:
+            class_value = rf"""(?:[^"']*\s)?{re.escape(class_name)}(?:\s[^"']*)?"""
+        else:
+            class_value = r"\s*" + r"\s+".join(re.escape(class_word) for class_word in class_words) + r"\s*"
+        # class has to follow whitespace so data-class and similar attributes don't match
+        pattern = re.compile(
+            rf"""<{tag}\b[^>]*\sclass\s*=\s*["']{class_value}["'][^>]*>(.*?)</{tag}\s*>""".encode("utf-8"),
+            re.DOTALL | re.IGNORECASE,
+        )
+        tracker_value_patterns[(tag, class_name)] = pattern
+    return pattern
+
+
+def extract_tracker_values(page_content, tag, class_name, count):
+    # scans only until the count-th <tag class="class_name"> element instead of building a tree of the page
+    values = []
+    nested_tag = f"<{tag}".encode("utf-8")
+    for match in get_tracker_value_pattern(tag, class_name).finditer(page_content):
+        if nested_tag in match.group(1).lower():
+            break
+        values.append(html.unescape(HTML_TAG_PATTERN.sub(b"", match.group(1)).decode("utf-8", "replace")))
+        if len(values) == count:
+            return values
 
+    # markup the pattern can't follow (nested tags of the same name, odd quoting), let BeautifulSoup parse just those elements
+    bs = BeautifulSoup(page_content, "html.parser", parse_only=SoupStrainer(tag, {"class": class_name}))
+    return [element.text for element in bs.find_all(tag, {"class": class_name})][:count]
 
-def parse_streamscharts_duration_data(bs):
-    streamscharts_duration = bs.find_all("div", {"class": "text-xs font-bold"})[3].text
+
+def extract_meta_content(page_content, name):
+    match = re.search(rb"""<meta\b[^>]*\sname\s*=\s*["']""" + re.escape(name.encode("utf-8")) + rb"""["'][^>]*\scontent\s*=\s*["']([^"']*)["']""", page_content, re.IGNORECASE)
+    if match:
+        return html.unescape(match.group(1).decode("utf-8", "replace"))
+
+    bs = BeautifulSoup(page_content, "html.parser", parse_only=SoupStrainer("meta", {"name": name}))
+    description_meta = bs.find("meta", {"name": name})
+    return description_meta.get("content") if description_meta else None
+
+
+def memoize_tracker_result(parse_function):
+    # successful results are kept for the session, failures are retried on the next call
+    @wraps(parse_function)
+    def wrapper(*args, **kwargs):
+        key = (parse_function.__name__, args, tuple(sorted(kwargs.items())))
+        if key in tracker_results:
+            return tracker_results[key]
+        result = parse_function(*args, **kwargs)
+        if result is not None and result != (None, None):
+            tracker_results[key] = result
+        return result
+    return wrapper
+
+
+def parse_streamscharts_duration_data(page_content):
+    streamscharts_duration = extract_tracker_values(page_content, "div", "text-xs font-bold", 4)[3]
     streamscharts_duration_in_minutes = parse_website_duration(streamscharts_duration)
     return streamscharts_duration_in_minutes
 
 
+@memoize_tracker_result
 def parse_duration_streamscharts(streamscharts_url):
     try:
-        # Method 1: Using requests
-        response = requests.get(streamscharts_url, headers=return_user_agent(), timeout=10)
-        if response.status_code == 200:
-            bs = BeautifulSoup(response.content, "html.parser")
-            return parse_streamscharts_duration_data(bs)
-
-        # Method 2: Using Selenium
-        print("Opening Streamcharts with browser...")
-        with SB(uc=True) as sb:
-            sb.uc_open_with_reconnect(streamscharts_url, reconnect_time=3)
-            handle_cloudflare(sb)
-            bs = BeautifulSoup(sb.driver.page_source, "html.parser")
-            return parse_streamscharts_duration_data(bs)
-
+        page_content, _ = fetch_tracker_page(streamscharts_url, "Streamscharts")
+        return parse_streamscharts_duration_data(page_content)
     except Exception:
         pass
 
@@ -689,28 +1707,17 @@ def parse_duration_streamscharts(streamscharts_url):
     return None
 
 
-def parse_twitchtracker_duration_data(bs):
-    twitchtracker_duration = bs.find_all("div", {"class": "g-x-s-value"})[0].text
+def parse_twitchtracker_duration_data(page_content):
+    twitchtracker_duration = extract_tracker_values(page_content, "div", "g-x-s-value", 1)[0]
     twitchtracker_duration_in_minutes = parse_website_duration(twitchtracker_duration)
     return twitchtracker_duration_in_minutes
 
 
+@memoize_tracker_result
 def parse_duration_twitchtracker(twitchtracker_url, try_alternative=True):
     try:
-        # Method 1: Using requests
-        response = requests.get(twitchtracker_url, headers=return_user_agent(), timeout=10)
-        if response.status_code == 200:
-            bs = BeautifulSoup(response.content, "html.parser")
-            return parse_twitchtracker_duration_data(bs)
-
-        # Method 2: Using Selenium
-        print("Opening Twitchtracker with browser...")
-        with SB(uc=True) as sb:
-            sb.uc_open_with_reconnect(twitchtracker_url, reconnect_time=3)
-            handle_cloudflare(sb)
-            bs = BeautifulSoup(sb.driver.page_source, "html.parser")
-            return parse_twitchtracker_duration_data(bs)
-
+        page_content, _ = fetch_tracker_page(twitchtracker_url, "Twitchtracker")
+        return parse_twitchtracker_duration_data(page_content)
     except Exception:
         pass
 
@@ -721,28 +1728,17 @@ def parse_duration_twitchtracker(twitchtracker_url, try_alternative=True):
     return None
 
 
-def parse_sullygnome_duration_data(bs):
-    sullygnome_duration = bs.find_all("div", {"class": "MiddleSubHeaderItemValue"})[7].text.split(",")
+def parse_sullygnome_duration_data(page_content):
+    sullygnome_duration = extract_tracker_values(page_content, "div", "MiddleSubHeaderItemValue", 8)[7].split(",")
     sullygnome_duration_in_minutes = parse_website_duration(sullygnome_duration)
     return sullygnome_duration_in_minutes
 
 
+@memoize_tracker_result
 def parse_duration_sullygnome(sullygnome_url):
     try:
-        # Method 1: Using requests
-        response = requests.get(sullygnome_url, headers=return_user_agent(), timeout=10)
-        if response.status_code == 200:
-            bs = BeautifulSoup(response.content, "html.parser")
-            return parse_sullygnome_duration_data(bs)
-
-        # Method 2: Using Selenium
-        print("Opening Sullygnome with browser...")
-        with SB(uc=True) as sb:
-            sb.uc_open_with_reconnect(sullygnome_url, reconnect_time=3)
-            handle_cloudflare(sb)
-            bs = BeautifulSoup(sb.driver.page_source, "html.parser")
-            return parse_sullygnome_duration_data(bs)
-
+        page_content, _ = fetch_tracker_page(sullygnome_url, "Sullygnome")
+        return parse_sullygnome_duration_data(page_content)
     except Exception:
         pass
 
@@ -752,10 +1748,10 @@ def parse_duration_sullygnome(sullygnome_url):
     return None
 
 
-def parse_streamscharts_datetime_data(bs):
+def parse_streamscharts_datetime_data(page_content):
     stream_date = (
-        bs.find_all("time", {"class": "ml-2 font-bold"})[0]
-        .text.strip()
+        extract_tracker_values(page_content, "time", "ml-2 font-bold", 1)[0]
+        .strip()
         .replace(",", "")
         + ":00"
     )
@@ -763,7 +1759,7 @@ def parse_streamscharts_datetime_data(bs):
 
 
     try:
-        streamcharts_duration = bs.find_all("span", {"class": "mx-2 font-bold"})[0].text
+        streamcharts_duration = extract_tracker_values(page_content, "span", "mx-2 font-bold", 1)[0]
         streamcharts_duration_in_minutes = parse_website_duration(streamcharts_duration)
     except Exception:
         streamcharts_duration_in_minutes = None
@@ -772,37 +1768,22 @@ def parse_streamscharts_datetime_data(bs):
     return stream_datetime, streamcharts_duration_in_minutes
 
 
+@memoize_tracker_result
 def parse_datetime_streamscharts(streamscharts_url):
     print("\nRetrieving datetime from Streamscharts...")
 
     try:
-        # Method 1: Using requests
-        response = requests.get(
-            streamscharts_url, headers=return_user_agent(), timeout=10
-        )
-        if response.status_code == 200:
-            bs = BeautifulSoup(response.content, "html.parser")
-            return parse_streamscharts_datetime_data(bs)
-
-        # Method 2: Using Selenium
-        print("Opening Streamscharts with browser...")
-
-        with SB(uc=True) as sb:
-            sb.uc_open_with_reconnect(streamscharts_url, reconnect_time=3)
-            handle_cloudflare(sb)
-            bs = BeautifulSoup(sb.driver.page_source, "html.parser")
-
-            return parse_streamscharts_datetime_data(bs)
-
+        page_content, _ = fetch_tracker_page(streamscharts_url, "Streamscharts")
+        return parse_streamscharts_datetime_data(page_content)
     except Exception:
         pass
     return None, None
 
 
-def parse_twitchtracker_datetime_data(bs):
-    twitchtracker_datetime = bs.find_all("div", {"class": "stream-timestamp-dt"})[0].text
+def parse_twitchtracker_datetime_data(page_content):
+    twitchtracker_datetime = extract_tracker_values(page_content, "div", "stream-timestamp-dt", 1)[0]
     try:
-        twitchtracker_duration = bs.find_all("div", {"class": "g-x-s-value"})[0].text
+        twitchtracker_duration = extract_tracker_values(page_content, "div", "g-x-s-value", 1)[0]
         twitchtracker_duration_in_minutes = parse_website_duration(twitchtracker_duration)
     except Exception:
         twitchtracker_duration_in_minutes = None
@@ -811,187 +1792,287 @@ def parse_twitchtracker_datetime_data(bs):
     return twitchtracker_datetime, twitchtracker_duration_in_minutes
 
 
-def parse_datetime_twitchtracker(twitchtracker_url):
-    print("\nRetrieving datetime from Twitchtracker...")
+def parse_twitchtracker_browser_datetime_data(page_content):
+    # the page rendered in the browser only carries the datetime in its meta description
+    description_content = extract_meta_content(page_content, "description")
+    if not description_content:
+        return None, None
 
-    try:
-        # Method 1: Using requests
-        response = requests.get(twitchtracker_url, headers=return_user_agent(), timeout=10)
-        if response.status_code == 200:
-            bs = BeautifulSoup(response.content, "html.parser")
-            return parse_twitchtracker_datetime_data(bs)
+    match = re.search(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}", description_content)
+    if not match:
+        return None, None
+    twitchtracker_datetime = match.group(0)
+    print(f"Datetime: {twitchtracker_datetime}")
 
-        # Method 2: Using Selenium
-        print("Opening Twitchtracker with browser...")
-        with SB(uc=True) as sb:
-            sb.uc_open_with_reconnect(twitchtracker_url, reconnect_time=3)
-            handle_cloudflare(sb)
+    try:
+        twitchtracker_duration = extract_tracker_values(page_content, "div", "g-x-s-value", 1)[0]
+        twitchtracker_duration_in_minutes = parse_website_duration(twitchtracker_duration)
+    except Exception:
+        twitchtracker_duration_in_minutes = None
 
-            bs = BeautifulSoup(sb.driver.page_source, "html.parser")
-            description_meta = bs.find("meta", {"name": "description"})
-            twitchtracker_datetime = None
+    return twitchtracker_datetime, twitchtracker_duration_in_minutes
 
-            if description_meta:
-                description_content = description_meta.get("content")
-                match = re.search(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}", description_content)
-                if match:
-                    twitchtracker_datetime = match.group(0)
-                    print(f"Datetime: {twitchtracker_datetime}")
 
-                    try:
-                        twitchtracker_duration = bs.find_all("div", {"class": "g-x-s-value"})[0].text
-                        twitchtracker_duration_in_minutes = parse_website_duration(twitchtracker_duration)
-                    except Exception:
-                        twitchtracker_duration_in_minutes = None
+@memoize_tracker_result
+def parse_datetime_twitchtracker(twitchtracker_url):
+    print("\nRetrieving datetime from Twitchtracker...")
 
-                    return twitchtracker_datetime, twitchtracker_duration_in_minutes
+    try:
+        page_content, from_browser = fetch_tracker_page(twitchtracker_url, "Twitchtracker")
+        if from_browser:
+            return parse_twitchtracker_browser_datetime_data(page_content)
+        return parse_twitchtracker_datetime_data(page_content)
     except Exception:
         pass
     return None, None
 
 
-def parse_sullygnome_datetime_data(bs):
-    stream_date = bs.find_all("div", {"class": "MiddleSubHeaderItemValue"})[6].text
+def parse_sullygnome_datetime_data(page_content):
+    sullygnome_values = extract_tracker_values(page_content, "div", "MiddleSubHeaderItemValue", 8)
+    stream_date = sullygnome_values[6]
     modified_stream_date = remove_chars_from_ordinal_numbers(stream_date)
     formatted_stream_date = datetime.strptime(modified_stream_date, "%A %d %B %I:%M%p").strftime("%m-%d %H:%M:%S")
     sullygnome_datetime = str(datetime.now().year) + "-" + formatted_stream_date
 
-    sullygnome_duration = bs.find_all("div", {"class": "MiddleSubHeaderItemValue"})[7].text.split(",")
+    sullygnome_duration = sullygnome_values[7].split(",")
     sullygnome_duration_in_minutes = parse_website_duration(sullygnome_duration)
 
     print(f"Datetime: {sullygnome_datetime}")
     return sullygnome_datetime, sullygnome_duration_in_minutes
 
 
+@memoize_tracker_result
 def parse_datetime_sullygnome(sullygnome_url):
     print("\nRetrieving datetime from Sullygnome...")
 
     try:
-        # Method 1: Using requests
-        response = requests.get(sullygnome_url, headers=return_user_agent(), timeout=10)
-        if response.status_code == 200:
-            bs = BeautifulSoup(response.content, "html.parser")
-            return parse_sullygnome_datetime_data(bs)
-
-        # Method 2: Using Selenium
-        print("Opening Sullygnome with browser...")
-        with SB(uc=True) as sb:
-            sb.uc_open_with_reconnect(sullygnome_url, reconnect_time=3)
-            handle_cloudflare(sb)
-            bs = BeautifulSoup(sb.driver.page_source, "html.parser")
-            return parse_sullygnome_datetime_data(bs)
-
+        page_content, _ = fetch_tracker_page(sullygnome_url, "Sullygnome")
+        return parse_sullygnome_datetime_data(page_content)
     except Exception:
         pass
     return None, None
 
 
-def unmute_vod(m3u8_link):
+class SegmentTable:
+    __slots__ = ("durations", "muted", "offsets")
+
+    def __init__(self):
+        self.durations = array("d")
+        self.muted = array("b")
+        # byte offset of each segment uri line inside the playlist it was parsed from
+        self.offsets = array("q")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def total_duration(self):
+        return sum(self.durations)
+
+    @property
+    def is_muted(self):
+        return 1 in self.muted
+
+    def segment_uri(self, playlist_data, index):
+        offset = self.offsets[index]
+        end = playlist_data.find(b"\n", offset)
+        return bytes(playlist_data[offset:end if end != -1 else len(playlist_data)]).strip().decode("utf-8")
+
+
+def parse_m3u8_stream(stream, chunk_size=1 << 16):
+    # accepts bytes, anything with read() (files, mmap, BytesIO) or an iterable of byte chunks
+    if isinstance(stream, (bytes, bytearray, memoryview)):
+        stream = io.BytesIO(stream)
+    if hasattr(stream, "read"):
+        chunks = iter(lambda: stream.read(chunk_size), b"")
+    else:
+        chunks = iter(stream)
+
+    segment_table = SegmentTable()
+    segment_duration = 0.0
+    buffer = b""
+    buffer_offset = 0
+
+    def parse_line(line, line_offset):
+        nonlocal segment_duration
+        line = line.strip()
+        if line.startswith(b"#EXTINF:"):
+            segment_duration = float(line[8:].split(b",", 1)[0])
+        elif line and not line.startswith(b"#"):
+            segment_table.durations.append(segment_duration)
+            segment_table.muted.append(b"-unmuted" in line)
+            segment_table.offsets.append(line_offset)
+            segment_duration = 0.0
+
+    for chunk in chunks:
+        buffer += chunk
+        line_start = 0
+        line_end = buffer.find(b"\n")
+        while line_end != -1:
+            parse_line(buffer[line_start:line_end], buffer_offset + line_start)
+            line_start = line_end + 1
+            line_end = buffer.find(b"\n", line_start)
+        buffer_offset += line_start
+        buffer = buffer[line_start:]
+    if buffer:
+        parse_line(buffer, buffer_offset)
+    return segment_table
+
+
+def parse_m3u8_file(m3u8_file_path):
+    with open(m3u8_file_path, "rb") as m3u8_file:
+        if os.fstat(m3u8_file.fileno()).st_size == 0:
+            return b"", SegmentTable()
+        playlist_data = mmap.mmap(m3u8_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return playlist_data, parse_m3u8_stream(playlist_data)
+
+
+def fetch_m3u8_playlist(m3u8_link, max_retries=5):
+    if m3u8_link in variant_playlists:
+        return variant_playlists[m3u8_link]
+    attempt = 0
+    while attempt < max_retries:
+        try:
+            response = requests.get(m3u8_link, timeout=10)
+            response.raise_for_status()
+            return response.content
+        except Exception:
+            attempt += 1
+            sleep(1)
+    raise VodRecoveryError(f"Failed to fetch M3U8 after {max_retries} attempts.")
+
+
+def get_unmuted_segment_url(base_link, index, muted):
+    if muted:
+        return f"{base_link}{index}-muted.ts"
+    return f"{base_link}{index}.ts"
+
+
+def rewrite_m3u8_segments(playlist_data, segment_table, segment_url):
+    # copies everything but the segment uri lines verbatim, so tags and their order survive
+    playlist_parts = []
+    previous_end = 0
+    for index, offset in enumerate(segment_table.offsets):
+        playlist_parts.append(playlist_data[previous_end:offset])
+        playlist_parts.append(segment_url(index, segment_table.muted[index]).encode("utf-8"))
+        line_end = playlist_data.find(b"\n", offset)
+        previous_end = line_end if line_end != -1 else len(playlist_data)
+    playlist_parts.append(playlist_data[previous_end:])
+    return b"".join(playlist_parts)
+
+
+def run_m3u8_pipeline(m3u8_link, playlist_data=None):
+    # one download feeds every stage: parse -> detect muted -> rewrite -> segments -> duration
+    if playlist_data is None:
+        playlist_data = fetch_m3u8_playlist(m3u8_link)
+    segment_table = parse_m3u8_stream(playlist_data)
+    base_link = m3u8_link.replace("index-dvr.m3u8", "")
+
+    def segment_url(index, muted):
+        return get_unmuted_segment_url(base_link, index, muted)
+
+    return {
+        "m3u8_link": m3u8_link,
+        "segment_table": segment_table,
+        "is_muted": segment_table.is_muted,
+        "playlist": rewrite_m3u8_segments(playlist_data, segment_table, segment_url),
+        "segments": [segment_url(index, muted) for index, muted in enumerate(segment_table.muted)],
+        "duration": segment_table.total_duration,
+    }
+
+
+def write_m3u8_pipeline_output(m3u8_pipeline):
+    m3u8_link = m3u8_pipeline["m3u8_link"]
     video_filepath = get_vod_filepath(parse_streamer_from_m3u8_link(m3u8_link), parse_video_id_from_m3u8_link(m3u8_link))
-    
-    write_m3u8_to_file(m3u8_link, video_filepath)
-    
-    with open(video_filepath, "r+", encoding="utf-8") as video_file:
-        file_contents = video_file.readlines()
-        video_file.seek(0)
-        
-        is_muted = is_video_muted(m3u8_link)
-        base_link = m3u8_link.replace("index-dvr.m3u8", "")
-        counter = 0
-        
-        for segment in file_contents:
-            if segment.startswith("#"):
-                video_file.write(segment)
-            else:
-                if is_muted:
-                    if "-unmuted" in segment:
-                        video_file.write(f"{base_link}{counter}-muted.ts\n")
-                    else:
-                        video_file.write(f"{base_link}{counter}.ts\n")
-                else:
-                    video_file.write(f"{base_link}{counter}.ts\n")
-                counter += 1
-        
-        video_file.truncate()
-    
-    if is_muted:
+    with open(video_filepath, "wb") as video_file:
+        video_file.write(m3u8_pipeline["playlist"])
+    return video_filepath
+
+
+def unmute_vod(m3u8_link):
+    m3u8_pipeline = run_m3u8_pipeline(m3u8_link)
+    video_filepath = write_m3u8_pipeline_output(m3u8_pipeline)
+
+    if m3u8_pipeline["is_muted"]:
         print(f"{os.path.normpath(video_filepath)} has been unmuted!\n")
 
 def return_m3u8_duration(m3u8_link):
-    total_duration = 0
-    file_contents = requests.get(m3u8_link, stream=True, timeout=30).text.splitlines()
-    for line in file_contents:
-        if line.startswith("#EXTINF:"):
-            segment_duration = float(line.split(":")[1].split(",")[0])
-            total_duration += segment_duration
-    total_minutes = int(total_duration // 60)
+    response = requests.get(m3u8_link, stream=True, timeout=30)
+    segment_table = parse_m3u8_stream(response.iter_content(chunk_size=1 << 16))
+    total_minutes = int(segment_table.total_duration // 60)
     return total_minutes
 
 
 def process_m3u8_configuration(m3u8_link, skip_check=False):
-    playlist_segments = get_all_playlist_segments(m3u8_link)
+    m3u8_pipeline = run_m3u8_pipeline(m3u8_link)
 
     check_segments = read_config_by_key("settings", "CHECK_SEGMENTS") and not skip_check
 
     m3u8_source = None
-    if is_video_muted(m3u8_link):
+    is_muted = m3u8_pipeline["is_muted"]
+    store_resolution(parse_video_id_from_m3u8_link(m3u8_link), muted=is_muted, duration=m3u8_pipeline["duration"])
+    if is_muted:
         print("Video contains muted segments")
         if read_config_by_key("settings", "UNMUTE_VIDEO"):
-            unmute_vod(m3u8_link)
-            m3u8_source = get_vod_filepath(parse_streamer_from_m3u8_link(m3u8_link),parse_video_id_from_m3u8_link(m3u8_link),)
+            m3u8_source = write_m3u8_pipeline_output(m3u8_pipeline)
+            print(f"{os.path.normpath(m3u8_source)} has been unmuted!\n")
     else:
         m3u8_source = m3u8_link
-        os.remove(get_vod_filepath(parse_streamer_from_m3u8_link(m3u8_link), parse_video_id_from_m3u8_link(m3u8_link)))
     if check_segments:
         print("Checking valid segments...")
-        asyncio.run(validate_playlist_segments(playlist_segments))
+        asyncio.run(validate_playlist_segments(m3u8_pipeline["segments"]))
     return m3u8_source
 
 
 def get_all_playlist_segments(m3u8_link):
-    video_file_path = get_vod_filepath(parse_streamer_from_m3u8_link(m3u8_link), parse_video_id_from_m3u8_link(m3u8_link))
-    write_m3u8_to_file(m3u8_link, video_file_path)
+    m3u8_pipeline = run_m3u8_pipeline(m3u8_link)
+    write_m3u8_pipeline_output(m3u8_pipeline)
+    return m3u8_pipeline["segments"]
 
-    segment_list = []
-    base_link = m3u8_link.replace("index-dvr.m3u8", "")
-    counter = 0
-    
-    with open(video_file_path, "r+", encoding="utf-8") as video_file:
-        file_contents = video_file.readlines()
-        video_file.seek(0)
-        
-        for segment in file_contents:
-            if segment.startswith("#"):
-                video_file.write(segment)
-            else:
-                if "-unmuted" in segment:
-                    new_segment = f"{base_link}{counter}-muted.ts"
-                else:
-                    new_segment = f"{base_link}{counter}.ts"
-                
-                video_file.write(f"{new_segment}\n")
-                segment_list.append(new_segment)
-                counter += 1
-        
-        video_file.truncate()
-    return segment_list
+
+async def check_playlist_segments(segments, max_concurrency=64, session=None, on_progress=None):
+    all_segments = [url.strip() for url in segments]
+    segment_results = [None] * len(all_segments)
+    segment_indices = iter(range(len(all_segments)))
+    host_limiters = {}
+    checked_segment_count = 0
+
+    async def worker():
+        nonlocal checked_segment_count
+        for index in segment_indices:
+            url = all_segments[index]
+            limiter = host_limiters.setdefault(urlparse(url).netloc, AdaptiveLimiter(max_limit=max_concurrency))
+            segment_results[index] = await fetch_segment_info(session, url, retries=5, limiter=limiter)
+            checked_segment_count += 1
+            if on_progress:
+                on_progress(checked_segment_count, len(all_segments))
+
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max_concurrency, ttl_dns_cache=300))
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(max_concurrency, len(all_segments)) or 1)))
+    finally:
+        if owns_session:
+            await session.close()
+    return segment_results
 
 
-async def validate_playlist_segments(segments):
-    valid_segments = []
+async def validate_playlist_segments(segments, max_concurrency=64):
     all_segments = [url.strip() for url in segments]
-    available_segment_count = 0
 
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_status(session, url) for url in all_segments]
-        for index, task in enumerate(asyncio.as_completed(tasks)):
-            url = await task
-            if url:
-                available_segment_count += 1
-                valid_segments.append(url)
-            print(f"\rChecking segments {index + 1} / {len(all_segments)}", end="")
+    def print_progress(checked_segment_count, segment_count):
+        print(f"\rChecking segments {checked_segment_count} / {segment_count}", end="")
+
+    segment_results = await check_playlist_segments(all_segments, max_concurrency, on_progress=print_progress)
+
+    valid_segments = [segment_info["url"] for segment_info in segment_results if segment_info]
+    available_segment_count = len(valid_segments)
+    total_size = sum(segment_info["size"] or 0 for segment_info in segment_results if segment_info)
 
     print()
+    if total_size:
+        print(f"Available segments total {total_size / (1024 * 1024):.1f} MB")
     if available_segment_count == len(all_segments) or available_segment_count == 0:
         print("All Segments are Available\n")
     elif available_segment_count < len(all_segments):
@@ -1006,8 +2087,18 @@ def vod_recover(streamer_name, video_id, timestamp, tracker_url=None):
     if vod_age > 60:
         print("Video is older than 60 days. Chances of recovery are very slim.")
     vod_url = None
-    if timestamp:
-        vod_url = return_supported_qualities(asyncio.run(get_vod_urls(streamer_name, video_id, timestamp)))
+    # every timestamp tried below draws on one request budget and never re-probes an (epoch, domain) pair
+    probed = set()
+    cached_resolution = get_cached_resolution(video_id) or {}
+    if cached_resolution.get("m3u8_link"):
+        print(f"\n\033[92m\u2713 Found cached M3U8 URL: {cached_resolution['m3u8_link']}\033[0m")
+        vod_url = return_supported_qualities(cached_resolution["m3u8_link"])
+    elif timestamp:
+        m3u8_link, qualities = asyncio.run(recover_vod_playlist(streamer_name, video_id, timestamp, probed))
+        if m3u8_link:
+            record_vod_hit(m3u8_link, timestamp)
+            store_resolution(video_id, m3u8_link=m3u8_link, streamer=streamer_name, timestamp=timestamp)
+        vod_url = return_supported_qualities(m3u8_link, qualities)
 
     if vod_url is None:
         alternate_websites = generate_website_links(streamer_name, video_id, tracker_url)
@@ -1016,23 +2107,25 @@ def vod_recover(streamer_name, video_id, timestamp, tracker_url=None):
         all_timestamps = [timestamp]
 
         # Check if any alternate websites have a different timestamp
+        tracker_lookups = []
         for website in alternate_websites:
-            parsed_timestamp = None
-            if "streamscharts" in website:                                                                                                              
-                parsed_timestamp, _ = parse_datetime_streamscharts(website)
+            if "streamscharts" in website:
+                tracker_lookups.append((parse_datetime_streamscharts, website))
             elif "twitchtracker" in website:
-                parsed_timestamp, _ = parse_datetime_twitchtracker(website)
+                tracker_lookups.append((parse_datetime_twitchtracker, website))
             elif "sullygnome" in website:
                 # If the timestamp shows a year different from the current one, skip it since SullyGnome doesn't provide the year
                 if timestamp and datetime.now().year != int(timestamp.split("-")[0]):
                     continue
-                parsed_timestamp, _ = parse_datetime_sullygnome(website)
-
-            if (parsed_timestamp and parsed_timestamp != timestamp and parsed_timestamp not in all_timestamps):
-                all_timestamps.append(parsed_timestamp)
-                vod_url = return_supported_qualities(asyncio.run(get_vod_urls(streamer_name, video_id, parsed_timestamp)))
-                if vod_url:
-                    return vod_url
+                tracker_lookups.append((parse_datetime_sullygnome, website))
+
+        m3u8_link, parsed_timestamp, qualities = asyncio.run(recover_vod_playlist_from_trackers(streamer_name, video_id, tracker_lookups, all_timestamps, probed))
+        if m3u8_link:
+            record_vod_hit(m3u8_link, parsed_timestamp)
+            store_resolution(video_id, m3u8_link=m3u8_link, streamer=streamer_name, timestamp=parsed_timestamp)
+            vod_url = return_supported_qualities(m3u8_link, qualities)
+            if vod_url:
+                return vod_url
         if not any(all_timestamps):
             print("\033[91m \n✖  Unable to get the datetime, Please input it manually using the recovery option. \033[0m")
             input("\nPress Enter to continue...")
@@ -1106,13 +2199,238 @@ def handle_retry_command(command):
     except Exception:
         return False
 
+def get_download_workers():
+    return int(read_config_by_key("settings", "DOWNLOAD_WORKERS") or 1)
+
+
+def read_playlist_segment_urls(m3u8_source):
+    if os.path.isfile(m3u8_source):
+        playlist_data, segment_table = parse_m3u8_file(m3u8_source)
+    else:
+        playlist_data = fetch_m3u8_playlist(m3u8_source)
+        segment_table = parse_m3u8_stream(playlist_data)
+
+    # rewritten playlists already hold absolute urls, remote ones are relative to the playlist
+    segment_urls = [urljoin(m3u8_source, segment_table.segment_uri(playlist_data, index)) for index in range(len(segment_table))]
+    return segment_urls, segment_table.total_duration
+
+
+def get_journal_filepath(streamer_name, video_id):
+    journal_filename = os.path.join(get_default_directory(), f"{streamer_name}_{video_id}.journal")
+    return journal_filename
+
+
+def get_journal_filepath_for_source(m3u8_source, output_path):
+    try:
+        if os.path.isfile(m3u8_source):
+            streamer_name, video_id = parse_vod_filename(m3u8_source)
+        else:
+            streamer_name, video_id = parse_streamer_from_m3u8_link(m3u8_source), parse_video_id_from_m3u8_link(m3u8_source)
+        return get_journal_filepath(streamer_name, video_id)
+    except (IndexError, ValueError):
+        return f"{os.path.splitext(output_path)[0]}.journal"
+
+
+def get_segment_list_hash(segment_urls):
+    return hashlib.sha1("\n".join(segment_urls).encode("utf-8")).hexdigest()
+
+
+def get_download_journal_header(part_path, segment_urls):
+    # the segment hash ties the journal to one playlist, a re-run at another quality starts over
+    return {"part_path": part_path, "segments": len(segment_urls), "segment_hash": get_segment_list_hash(segment_urls)}
+
+
+def read_download_journal(journal_path, part_path, segment_urls):
+    # returns how many leading segments are already complete in the part file,
+    # truncating anything written after the last checkpoint
+    try:
+        with open(journal_path, "r", encoding="utf-8") as journal_file:
+            header = json.loads(journal_file.readline())
+            if header != get_download_journal_header(part_path, segment_urls):
+                return 0, []
+            completed_segments = [json.loads(line) for line in journal_file if line.strip()]
+    except (OSError, ValueError):
+        return 0, []
+
+    completed_count = 0
+    completed_size = 0
+    missing_segments = []
+    for entry in completed_segments:
+        if entry["index"] != completed_count:
+            break
+        if entry["size"] is None:
+            missing_segments.append(entry["index"])
+        else:
+            completed_size += entry["size"]
+        completed_count += 1
+
+    if not os.path.exists(part_path) or os.path.getsize(part_path) < completed_size:
+        return 0, []
+    os.truncate(part_path, completed_size)
+    return completed_count, missing_segments
+
+
+async def fetch_segment(session, url, retries=5):
+    for attempt in range(retries):
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    segment = await response.read()
+                    # a short body means the connection dropped mid-transfer, retry it
+                    if response.content_length is None or len(segment) == response.content_length:
+                        return segment
+                elif response.status in (403, 404):
+                    return None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        if attempt < retries - 1:
+            await asyncio.sleep(2)
+    raise VodRecoveryError(f"Failed to download segment {url} after {retries} attempts.")
+
+
+async def download_playlist_segments(segment_urls, part_path, workers, description=None, journal_path=None, checkpoint_interval=32, show_progress=True):
+    next_index, missing_segments = 0, []
+    if journal_path:
+        next_index, missing_segments = read_download_journal(journal_path, part_path, segment_urls)
+        if next_index and show_progress:
+            print(f"Resuming download: {next_index} / {len(segment_urls)} segments already complete\n")
+
+    # workers may only run a bounded window ahead of the next segment to be written,
+    # so segments land in the output in playlist order without buffering the whole vod
+    write_window = asyncio.Semaphore(workers * 4)
+    segment_indices = iter(range(next_index, len(segment_urls)))
+    downloaded_segments = {}
+    journal_entries = []
+
+    def checkpoint():
+        # segment data must be durable before the journal claims it is complete
+        part_file.flush()
+        os.fsync(part_file.fileno())
+        if journal_file and journal_entries:
+            journal_file.write("".join(journal_entries))
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        journal_entries.clear()
+
+    connector = aiohttp.TCPConnector(limit=workers, limit_per_host=workers, keepalive_timeout=60, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+    journal_file = None
+    if journal_path:
+        journal_file = open(journal_path, "a" if next_index else "w", encoding="utf-8")
+        if not next_index:
+            journal_file.write(json.dumps(get_download_journal_header(part_path, segment_urls)) + "\n")
+
+    try:
+        with open(part_path, "ab" if next_index else "wb") as part_file, tqdm(total=len(segment_urls), initial=next_index, desc=description, unit="seg", colour="green", leave=None, disable=not (show_progress and get_use_progress_bar())) as pbar:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+                async def worker():
+                    nonlocal next_index
+                    while True:
+                        await write_window.acquire()
+                        index = next(segment_indices, None)
+                        if index is None:
+                            write_window.release()
+                            return
+                        downloaded_segments[index] = await fetch_segment(session, segment_urls[index])
+                        while next_index in downloaded_segments:
+                            segment = downloaded_segments.pop(next_index)
+                            if segment is None:
+                                missing_segments.append(next_index)
+                            else:
+                                part_file.write(segment)
+                            journal_entries.append(json.dumps({"index": next_index, "size": None if segment is None else len(segment)}) + "\n")
+                            next_index += 1
+                            write_window.release()
+                            pbar.update(1)
+                        if len(journal_entries) >= checkpoint_interval:
+                            checkpoint()
+
+                tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    checkpoint()
+    finally:
+        if journal_file:
+            journal_file.close()
+    return missing_segments
+
+
+def download_m3u8_video_native(m3u8_source, output_path, retries=3):
+    try:
+        segment_urls, total_duration = read_playlist_segment_urls(m3u8_source)
+    except (VodRecoveryError, OSError) as error:
+        print(f"\n\033[91m\u2717 Could not read the playlist: {error}\033[0m")
+        return False
+    if not segment_urls:
+        return False
+
+    output_filename = os.path.basename(output_path)
+    part_path = f"{output_path}.part.ts"
+    journal_path = get_journal_filepath_for_source(m3u8_source, output_path)
+    workers = get_download_workers()
+    print(f"\nDownloading {len(segment_urls)} segments with {workers} workers...\n")
+
+    for attempt in range(retries):
+        try:
+            missing_segments = asyncio.run(download_playlist_segments(segment_urls, part_path, workers, output_filename, journal_path))
+            break
+        # only network and disk failures are worth resuming, anything else is a bug and surfaces as one
+        except (VodRecoveryError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as error:
+            print(f"\n\033[91m\u2717 Segment download failed: {error}\033[0m")
+            if attempt == retries - 1:
+                print(f"Giving up on the native downloader after {retries} attempts.")
+                return False
+            print("Resuming from the last checkpoint...\n")
+
+    if missing_segments:
+        print(f"\n{len(missing_segments)} out of {len(segment_urls)} segments were unavailable and have been skipped.")
+
+    command = [
+        get_ffmpeg_path(),
+        "-hide_banner",
+        "-i", part_path,
+        "-c", "copy",
+        "-f", get_ffmpeg_format(get_default_video_format()),
+        "-y", output_path,
+    ]
+    print("\nCommand: " + " ".join(command) + "\n")
+
+    try:
+        if get_use_progress_bar():
+            handle_progress_bar(command, output_filename, total_duration)
+        else:
+            subprocess.run(command, check=True)
+    except Exception:
+        return False
+
+    os.remove(part_path)
+    os.remove(journal_path)
+    return True
+
+
 # keep
 def download_m3u8_video_url(m3u8_link, output_filename):
+    # the user is asked about an existing file once, the ffmpeg fallback reuses that answer
+    asked_to_redownload = False
+    if get_default_downloader() == "ffmpeg" and get_download_workers() > 1:
+        output_path = os.path.normpath(os.path.join(get_default_directory(), output_filename))
+        handle_file_already_exists(output_path)
+        asked_to_redownload = True
+        if download_m3u8_video_native(m3u8_link, output_path):
+            return True
+        print("\nFalling back to ffmpeg...")
+
     if os.name != 'nt':
         output_filename = quote_filename(output_filename)
 
     output_path = os.path.normpath(os.path.join(get_default_directory(), output_filename))
-    handle_file_already_exists(output_path)
+    if not asked_to_redownload:
+        handle_file_already_exists(output_path)
 
     downloader = get_default_downloader()
 
@@ -1154,6 +2472,11 @@ def download_m3u8_video_file(m3u8_file_path, output_filename):
 
     downloader = get_default_downloader()
 
+    if downloader == "ffmpeg" and get_download_workers() > 1:
+        if download_m3u8_video_native(m3u8_file_path, output_path):
+            return True
+        print("\nFalling back to ffmpeg...")
+
     if downloader == "ffmpeg":
         command = [
             get_ffmpeg_path(),
@@ -1259,21 +2582,30 @@ def get_filename_for_url_source(m3u8_source, title, stream_date):
 
     return filename
 
+TWITCH_GQL_URL = "https://gql.twitch.tv/gql"
+TWITCH_GQL_HEADERS = {
+    "Client-Id": "kimne78kx3ncx6brgo4mv6wki5h1ko",
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+}
+
+
+TWITCH_VOD_FIELDS = "title, broadcastType, createdAt, seekPreviewsURL, owner { login }"
+
+
+def get_twitch_vod_query(vod_id):
+    return f'query {{ video(id: "{vod_id}") {{ {TWITCH_VOD_FIELDS} }} }}'
+
+
 # keep
 def fetch_twitch_data(vod_id, retries=3, delay=5):
     attempt = 0
     while attempt < retries:
         try:
             res = requests.post(
-                "https://gql.twitch.tv/gql",
-                json={
-                    "query": f'query {{ video(id: "{vod_id}") {{ title, broadcastType, createdAt, seekPreviewsURL, owner {{ login }} }} }}'
-                },
-                headers={
-                    "Client-Id": "kimne78kx3ncx6brgo4mv6wki5h1ko",
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                },
+                TWITCH_GQL_URL,
+                json={"query": get_twitch_vod_query(vod_id)},
+                headers=TWITCH_GQL_HEADERS,
                 timeout=30,
             )
             if res.status_code == 200:
@@ -1286,23 +2618,622 @@ def fetch_twitch_data(vod_id, retries=3, delay=5):
 
     return None
 
-# keep
-def twitch_recover(link=None):
-    # get it from python vod.py <url> argv
-    url = sys.argv[1]
-    pattern = r"twitch\.tv/(?:[^\/]+\/)?(\d+)"
-    match = re.search(pattern, url)
-    vod_id = match.group(1)
-    data = fetch_twitch_data(vod_id)
-    vod_data = data["data"]["video"]
 
+class GqlBatcher:
+    # ids requested within one window go out as a single aliased query, v0: video(id: ...) v1: ...
+    def __init__(self, session, window=0.02, max_batch_size=25, retries=3):
+        self.session = session
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.retries = retries
+        self.pending = {}
+        self.inflight = {}
+        self.flush_handle = None
+        self.batch_tasks = set()
+        self.batches_sent = 0
+        self.ids_requested = 0
+
+    async def fetch(self, vod_id):
+        vod_id = str(vod_id).strip()
+        # ids are spliced into the query, anything but digits would break the whole batch
+        if not vod_id.isdigit():
+            return {"data": {"video": None}}
+        self.ids_requested += 1
+        vod_future = self.pending.get(vod_id) or self.inflight.get(vod_id)
+        if vod_future is None:
+            vod_future = self.pending[vod_id] = asyncio.get_running_loop().create_future()
+            if len(self.pending) >= self.max_batch_size:
+                self.flush()
+            elif self.flush_handle is None:
+                self.flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await asyncio.shield(vod_future)
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, {}
+        self.inflight.update(batch)
+        if batch:
+            batch_task = asyncio.ensure_future(self.send_batch(batch))
+            self.batch_tasks.add(batch_task)
+            batch_task.add_done_callback(self.batch_tasks.discard)
+
+    async def send_batch(self, batch):
+        vod_ids = list(batch)
+        query = "query { " + " ".join(f'v{index}: video(id: "{vod_id}") {{ {TWITCH_VOD_FIELDS} }}' for index, vod_id in enumerate(vod_ids)) + " }"
+        self.batches_sent += 1
+        data = None
+        try:
+            for attempt in range(self.retries):
+                try:
+                    async with self.session.post(TWITCH_GQL_URL, json={"query": query}, headers=TWITCH_GQL_HEADERS, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                        if response.status == 200:
+                            data = await response.json()
+                            break
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                    pass
+                if attempt < self.retries - 1:
+                    await asyncio.sleep(get_backoff_delay(attempt))
+        finally:
+            # callers get the same shape fetch_twitch_data returns, None when GQL could not be reached
+            videos = (data.get("data") or {}) if data else None
+            for index, vod_id in enumerate(vod_ids):
+                self.inflight.pop(vod_id, None)
+                if not batch[vod_id].done():
+                    batch[vod_id].set_result(None if videos is None else {"data": {"video": videos.get(f"v{index}")}})
+
+    def get_metrics(self):
+        return {"ids_requested": self.ids_requested, "batches_sent": self.batches_sent}
+
+
+gql_batchers = weakref.WeakKeyDictionary()
+
+
+def get_gql_batcher(session):
+    gql_batcher = gql_batchers.get(session)
+    if gql_batcher is None:
+        gql_batcher = gql_batchers[session] = GqlBatcher(session)
+    return gql_batcher
+
+
+async def fetch_twitch_data_async(session, vod_id):
+    return await get_gql_batcher(session).fetch(vod_id)
+
+
+def store_twitch_vod_resolution(vod_id, vod_data):
     current_url = urlparse(vod_data["seekPreviewsURL"])
 
     domain = current_url.netloc
     paths = current_url.path.split("/")
     vod_special_id = paths[paths.index([i for i in paths if "storyboards" in i][0]) - 1]
 
-    url = f"https://{domain}/{vod_special_id}/chunked/index-dvr.m3u8"
+    resolution = {
+        "m3u8_link": f"https://{domain}/{vod_special_id}/chunked/index-dvr.m3u8",
+        "title": vod_data["title"],
+        "broadcast_type": vod_data["broadcastType"],
+        "created_at": vod_data["createdAt"],
+        "streamer": (vod_data.get("owner") or {}).get("login"),
+    }
+    return store_resolution(vod_id, **resolution) or resolution
+
+
+def resolve_twitch_vod(vod_id):
+    cached_resolution = get_cached_resolution(vod_id)
+    if cached_resolution and cached_resolution.get("m3u8_link"):
+        return cached_resolution
+
+    data = fetch_twitch_data(vod_id)
+    if data is None or not data["data"]["video"]:
+        return None
+    return store_twitch_vod_resolution(vod_id, data["data"]["video"])
+
+
+# Library API: no prompts, prints or exits, results are dicts and failures raise.
+# Every coroutine accepts an optional aiohttp session so callers can share one pool.
+class VodRecoveryError(Exception):
+    pass
+
+
+class VodNotFoundError(VodRecoveryError):
+    pass
+
+
+class SingleFlight:
+    # concurrent callers with the same key await one in-flight call instead of each going upstream
+    def __init__(self, name):
+        self.name = name
+        self.inflight = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def run(self, key, coroutine_function, *args, **kwargs):
+        self.calls += 1
+        call_future = self.inflight.get(key)
+        if call_future is None:
+            self.executions += 1
+            call_future = asyncio.ensure_future(coroutine_function(*args, **kwargs))
+            self.inflight[key] = call_future
+            call_future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # shielded so one cancelled caller does not cancel the call for everyone else
+        return await asyncio.shield(call_future)
+
+    def get_metrics(self):
+        coalesced = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "upstream_calls": self.executions,
+            "coalesced": coalesced,
+            "coalescing_ratio": round(coalesced / self.calls, 4) if self.calls else 0.0,
+            "inflight": len(self.inflight),
+        }
+
+
+resolution_flights = SingleFlight("resolution")
+quality_probe_flights = SingleFlight("quality_probe")
+muted_detection_flights = SingleFlight("muted_detection")
+
+
+def get_single_flight_metrics():
+    return {flights.name: flights.get_metrics() for flights in (resolution_flights, quality_probe_flights, muted_detection_flights)}
+
+
+async def fetch_m3u8_playlist_async(session, m3u8_link, retries=5):
+    # always goes upstream: variant_playlists never expires, which only suits one interactive
+    # recovery, a long-running process would keep serving a live vod's playlist frozen
+    for attempt in range(retries):
+        try:
+            async with session.get(m3u8_link, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status in (403, 404):
+                    raise VodNotFoundError(f"Playlist not found: {m3u8_link}")
+                if response.status == 200:
+                    return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        if attempt < retries - 1:
+            await asyncio.sleep(get_backoff_delay(attempt))
+    raise VodRecoveryError(f"Failed to fetch M3U8 after {retries} attempts.")
+
+
+async def resolve_vod_async(video_id, streamer_name=None, timestamp=None, session=None):
+    flight_key = (str(video_id), streamer_name, timestamp)
+    return await resolution_flights.run(flight_key, lookup_vod_resolution, video_id, streamer_name, timestamp, session)
+
+
+async def lookup_vod_resolution(video_id, streamer_name=None, timestamp=None, session=None):
+    cached_resolution = get_cached_resolution(video_id) or {}
+    if cached_resolution.get("m3u8_link"):
+        return dict(cached_resolution, cached=True)
+
+    # without a streamer and timestamp only the GQL lookup of a still listed vod can work
+    if not streamer_name or not timestamp:
+        owns_session = session is None
+        if owns_session:
+            session = aiohttp.ClientSession()
+        try:
+            data = await fetch_twitch_data_async(session, video_id)
+        finally:
+            if owns_session:
+                await session.close()
+        if data is None:
+            raise VodRecoveryError(f"Twitch GQL lookup failed for video {video_id}")
+        vod_data = (data.get("data") or {}).get("video")
+        if not vod_data or not vod_data.get("seekPreviewsURL"):
+            raise VodNotFoundError(f"Video {video_id} is not listed on Twitch")
+        return dict(store_twitch_vod_resolution(video_id, vod_data), cached=False)
+
+    if calculate_epoch_timestamp(timestamp, 0) is None:
+        raise VodRecoveryError(f"Invalid timestamp: {timestamp}")
+    streamer_name = streamer_name.strip().lower()
+    m3u8_link, stats = await search_vod_url(streamer_name, video_id, timestamp, session=session)
+    if m3u8_link is None:
+        raise VodNotFoundError(f"No M3U8 URL found for {streamer_name} {video_id} after {stats['requests_sent']} requests")
+    record_vod_hit(m3u8_link, timestamp)
+    resolution = {"m3u8_link": m3u8_link, "streamer": streamer_name, "timestamp": timestamp}
+    resolution = store_resolution(video_id, **resolution) or resolution
+    return dict(resolution, cached=False, stats=stats)
+
+
+async def probe_vod_qualities_async(m3u8_link, session=None):
+    qualities = await quality_probe_flights.run(m3u8_link, probe_supported_qualities, m3u8_link, session)
+    if not qualities:
+        raise VodNotFoundError(f"No playable qualities found for {m3u8_link}")
+    return qualities
+
+
+async def unmute_vod_playlist_async(m3u8_link, session=None):
+    return await muted_detection_flights.run(m3u8_link, fetch_unmuted_playlist, m3u8_link, session)
+
+
+async def fetch_unmuted_playlist(m3u8_link, session=None):
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession()
+    try:
+        playlist_data = await fetch_m3u8_playlist_async(session, m3u8_link)
+    finally:
+        if owns_session:
+            await session.close()
+
+    m3u8_pipeline = run_m3u8_pipeline(m3u8_link, playlist_data)
+    store_resolution(parse_video_id_from_m3u8_link(m3u8_link), muted=m3u8_pipeline["is_muted"], duration=m3u8_pipeline["duration"])
+    return {
+        "m3u8_link": m3u8_link,
+        "is_muted": m3u8_pipeline["is_muted"],
+        "duration": m3u8_pipeline["duration"],
+        "playlist": m3u8_pipeline["playlist"],
+        "segments": m3u8_pipeline["segments"],
+    }
+
+
+async def validate_vod_segments_async(m3u8_link, session=None, max_concurrency=64):
+    unmuted_playlist = await unmute_vod_playlist_async(m3u8_link, session=session)
+    segment_results = await check_playlist_segments(unmuted_playlist["segments"], max_concurrency, session=session)
+    return {
+        "m3u8_link": m3u8_link,
+        "segments": len(segment_results),
+        "available": [segment_info["url"] for segment_info in segment_results if segment_info],
+        "missing": [url for url, segment_info in zip(unmuted_playlist["segments"], segment_results) if not segment_info],
+        "total_size": sum(segment_info["size"] or 0 for segment_info in segment_results if segment_info),
+    }
+
+
+async def download_vod_async(m3u8_link, output_path, workers=None, session=None):
+    ffmpeg_path = get_ffmpeg_path()
+    if ffmpeg_path is None:
+        raise VodRecoveryError("ffmpeg was not found, install it with ffdl install or add it to PATH")
+
+    unmuted_playlist = await unmute_vod_playlist_async(m3u8_link, session=session)
+    segment_urls = unmuted_playlist["segments"]
+    if not segment_urls:
+        raise VodRecoveryError(f"Playlist has no segments: {m3u8_link}")
+
+    part_path = f"{output_path}.part.ts"
+    journal_path = f"{os.path.splitext(output_path)[0]}.journal"
+    workers = workers or get_download_workers()
+    # a failed download or remux keeps the part file and journal, calling again resumes from them
+    try:
+        missing_segments = await download_playlist_segments(segment_urls, part_path, workers, journal_path=journal_path, show_progress=False)
+    except (VodRecoveryError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as error:
+        raise VodRecoveryError(f"Segment download failed: {error}") from error
+
+    ffmpeg_process = await asyncio.create_subprocess_exec(
+        ffmpeg_path,
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", part_path,
+        "-c", "copy",
+        "-f", get_ffmpeg_format(os.path.splitext(output_path)[1] or get_default_video_format()),
+        "-y", output_path,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, ffmpeg_error = await ffmpeg_process.communicate()
+    if ffmpeg_process.returncode != 0:
+        raise VodRecoveryError(f"ffmpeg failed to remux {part_path}: {ffmpeg_error.decode('utf-8', 'replace').strip()}")
+
+    os.remove(part_path)
+    os.remove(journal_path)
+    return {
+        "m3u8_link": m3u8_link,
+        "output_path": output_path,
+        "segments": len(segment_urls),
+        "missing_segments": missing_segments,
+        "duration": unmuted_playlist["duration"],
+    }
+
+
+def resolve_vod(video_id, streamer_name=None, timestamp=None):
+    return asyncio.run(resolve_vod_async(video_id, streamer_name, timestamp))
+
+
+def probe_vod_qualities(m3u8_link):
+    return asyncio.run(probe_vod_qualities_async(m3u8_link))
+
+
+def unmute_vod_playlist(m3u8_link):
+    return asyncio.run(unmute_vod_playlist_async(m3u8_link))
+
+
+def validate_vod_segments(m3u8_link, max_concurrency=64):
+    return asyncio.run(validate_vod_segments_async(m3u8_link, max_concurrency=max_concurrency))
+
+
+def download_vod(m3u8_link, output_path, workers=None):
+    return asyncio.run(download_vod_async(m3u8_link, output_path, workers))
+
+
+SERVER_PORT = 7359
+PLAYLIST_CACHE_MAX_ENTRIES = 256
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "*",
+    "Access-Control-Allow-Headers": "*",
+}
+session_key = web.AppKey("session", aiohttp.ClientSession)
+templates_key = web.AppKey("templates", dict)
+playlist_cache_key = web.AppKey("playlist_cache", dict)
+segment_cache_key = web.AppKey("segment_cache", object)
+SEGMENT_NAME_PATTERN = re.compile(r"^\d+(?:-muted|-unmuted)?\.ts$")
+
+
+class SegmentCache:
+    # segments on disk named by the sha1 of their upstream url, the dict keeps them in
+    # least recently used order and files are evicted once the byte budget is exceeded
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        cached_files = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".part"):
+                os.remove(entry.path)
+            elif entry.is_file():
+                cached_files.append((entry.stat().st_mtime, entry.name, entry.stat().st_size))
+        for _, file_name, size in sorted(cached_files):
+            self.entries[file_name] = size
+            self.total_bytes += size
+        self.evict()
+
+    def get_file_name(self, segment_url):
+        return f"{hashlib.sha1(segment_url.encode('utf-8')).hexdigest()}.ts"
+
+    def get(self, segment_url):
+        file_name = self.get_file_name(segment_url)
+        size = self.entries.pop(file_name, None)
+        if size is None:
+            self.misses += 1
+            return None
+        self.entries[file_name] = size
+        self.hits += 1
+        return os.path.join(self.directory, file_name)
+
+    def get_temp_path(self, segment_url):
+        # concurrent misses for one segment each write their own temp file, the last rename wins
+        return os.path.join(self.directory, f"{self.get_file_name(segment_url)}.{os.urandom(4).hex()}.part")
+
+    def add(self, segment_url, temp_path):
+        file_name = self.get_file_name(segment_url)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, os.path.join(self.directory, file_name))
+        self.total_bytes += size - self.entries.pop(file_name, 0)
+        self.entries[file_name] = size
+        self.evict()
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            file_name = next(iter(self.entries))
+            self.total_bytes -= self.entries.pop(file_name)
+            # a response still sending this file keeps its open handle, unlinking is safe
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                pass
+
+    def get_metrics(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.total_bytes, "max_bytes": self.max_bytes}
+
+
+def get_segment_cache():
+    max_bytes = read_config_by_key("settings", "SEGMENT_CACHE_MAX_BYTES") or 0
+    if max_bytes <= 0:
+        return None
+    directory = read_config_by_key("settings", "SEGMENT_CACHE_DIRECTORY") or os.path.join(get_script_directory(), "lib", "segment_cache")
+    return SegmentCache(os.path.expanduser(directory), max_bytes)
+
+
+def read_public_templates():
+    # public pages live next to the TwitchVodRecovery directory, read once at startup
+    project_directory = os.path.dirname(get_script_directory())
+    templates = {}
+    for template_name in ("public.html", "public.template.html"):
+        with open(os.path.join(project_directory, template_name), "r", encoding="utf-8") as template_file:
+            templates[template_name] = template_file.read()
+    return templates
+
+
+def log_request(request, message):
+    ip = request.headers.get("X-Forwarded-For") or request.headers.get("X-Real-IP") or request.remote or "unknown-ip"
+    print(f"{datetime.now(timezone.utc).isoformat(timespec='milliseconds')} [{ip}] {message}", flush=True)
+
+
+async def resolve_vod_or_http_error(session, video_id):
+    try:
+        return await resolve_vod_async(video_id, session=session)
+    except VodNotFoundError as error:
+        raise web.HTTPNotFound(text=str(error))
+    except VodRecoveryError as error:
+        raise web.HTTPBadGateway(text=str(error))
+
+
+async def handle_index(request):
+    return web.Response(text=request.app[templates_key]["public.html"], content_type="text/html")
+
+
+async def handle_video_page(request):
+    video_id = request.match_info["video_id"]
+    log_request(request, f"requested https://twitch.tv/videos/{video_id}")
+    await resolve_vod_or_http_error(request.app[session_key], video_id)
+
+    # players get the unmuted playlist from this service, muted segment names are already rewritten
+    player_path = f"/videos/{video_id}/playlist.m3u8"
+    if request.query.get("vlc"):
+        raise web.HTTPFound(f"vlc-x-callback://x-callback-url/stream?url={request.url.with_path(player_path)}")
+
+    player_url = player_path
+    page = request.app[templates_key]["public.template.html"].replace("__M3U8URLREPLACE__", player_url)
+    return web.Response(text=page, content_type="text/html", headers=CORS_HEADERS)
+
+
+async def handle_video_json(request):
+    video_id = request.match_info["video_id"]
+    log_request(request, f"requested /api/videos/{video_id}")
+    resolution = await resolve_vod_or_http_error(request.app[session_key], video_id)
+    return web.json_response(dict(resolution, video_id=video_id), headers=CORS_HEADERS)
+
+
+async def handle_video_qualities(request):
+    video_id = request.match_info["video_id"]
+    log_request(request, f"requested /api/videos/{video_id}/qualities")
+    m3u8_link = (await resolve_vod_or_http_error(request.app[session_key], video_id))["m3u8_link"]
+    try:
+        qualities = await probe_vod_qualities_async(m3u8_link, session=request.app[session_key])
+    except VodNotFoundError as error:
+        raise web.HTTPNotFound(text=str(error))
+    return web.json_response({"video_id": video_id, "m3u8_link": m3u8_link, "qualities": qualities}, headers=CORS_HEADERS)
+
+
+async def get_proxied_playlist(app, video_id, quality, m3u8_link):
+    playlist_cache = app[playlist_cache_key]
+    cached_playlist = playlist_cache.get(m3u8_link)
+    if cached_playlist and cached_playlist["expires_at"] > time():
+        return cached_playlist
+
+    unmuted_playlist = await unmute_vod_playlist_async(m3u8_link, session=app[session_key])
+    playlist = unmuted_playlist["playlist"]
+    if app[segment_cache_key] is not None:
+        # point segments at the caching segment proxy, relative to this service
+        segment_names = [segment_url.rsplit("/", 1)[1] for segment_url in unmuted_playlist["segments"]]
+
+        def segment_url(index, muted):
+            return f"/segments/{video_id}/{quality}/{segment_names[index]}"
+
+        playlist = rewrite_m3u8_segments(playlist, parse_m3u8_stream(playlist), segment_url)
+    # a finished vod never changes, a live one gets new segments every few seconds
+    max_age = 3600 if b"#EXT-X-ENDLIST" in playlist else 5
+    cached_playlist = {
+        "playlist": playlist,
+        "etag": f'"{hashlib.sha1(playlist).hexdigest()}"',
+        "max_age": max_age,
+        "expires_at": time() + max_age,
+    }
+    playlist_cache.pop(m3u8_link, None)
+    playlist_cache[m3u8_link] = cached_playlist
+    while len(playlist_cache) > PLAYLIST_CACHE_MAX_ENTRIES:
+        playlist_cache.pop(next(iter(playlist_cache)))
+    return cached_playlist
+
+
+async def handle_video_playlist(request):
+    video_id = request.match_info["video_id"]
+    quality = request.query.get("quality", "chunked")
+    if quality not in RESOLUTIONS:
+        raise web.HTTPBadRequest(text=f"Unknown quality {quality}, expected one of {', '.join(RESOLUTIONS)}")
+    m3u8_link = (await resolve_vod_or_http_error(request.app[session_key], video_id))["m3u8_link"].replace("/chunked/", f"/{quality}/")
+
+    try:
+        cached_playlist = await get_proxied_playlist(request.app, video_id, quality, m3u8_link)
+    except VodNotFoundError as error:
+        raise web.HTTPNotFound(text=str(error))
+    except VodRecoveryError as error:
+        raise web.HTTPBadGateway(text=str(error))
+
+    headers = dict(CORS_HEADERS, ETag=cached_playlist["etag"])
+    headers["Cache-Control"] = f"public, max-age={cached_playlist['max_age']}"
+    if request.headers.get("If-None-Match") == cached_playlist["etag"]:
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=cached_playlist["playlist"], content_type="application/vnd.apple.mpegurl", headers=headers)
+
+
+async def handle_segment(request):
+    video_id = request.match_info["video_id"]
+    quality = request.match_info["quality"]
+    segment_name = request.match_info["segment_name"]
+    segment_cache = request.app[segment_cache_key]
+    # only segment names of the resolved vod are proxied, never arbitrary upstream urls
+    if segment_cache is None or quality not in RESOLUTIONS or not SEGMENT_NAME_PATTERN.match(segment_name):
+        raise web.HTTPNotFound()
+    m3u8_link = (await resolve_vod_or_http_error(request.app[session_key], video_id))["m3u8_link"]
+    segment_url = m3u8_link.replace("/chunked/", f"/{quality}/").replace("index-dvr.m3u8", segment_name)
+
+    headers = dict(CORS_HEADERS)
+    headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    cached_path = segment_cache.get(segment_url)
+    if cached_path:
+        # FileResponse hands the file to the kernel with sendfile
+        return web.FileResponse(cached_path, headers=dict(headers, **{"Content-Type": "video/mp2t"}))
+
+    async with request.app[session_key].get(segment_url, timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)) as upstream:
+        if upstream.status in (403, 404):
+            raise web.HTTPNotFound()
+        if upstream.status != 200:
+            raise web.HTTPBadGateway(text=f"Upstream answered {upstream.status} for {segment_name}")
+
+        response = web.StreamResponse(headers=headers)
+        response.content_type = "video/mp2t"
+        if upstream.content_length is not None:
+            response.content_length = upstream.content_length
+        await response.prepare(request)
+
+        # tee the upstream body to the client and the cache, only a complete body is kept
+        temp_path = segment_cache.get_temp_path(segment_url)
+        written_bytes = 0
+        try:
+            with open(temp_path, "wb") as segment_file:
+                async for chunk in upstream.content.iter_chunked(1 << 16):
+                    segment_file.write(chunk)
+                    written_bytes += len(chunk)
+                    await response.write(chunk)
+            if upstream.content_length is None or written_bytes == upstream.content_length:
+                segment_cache.add(segment_url, temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    await response.write_eof()
+    return response
+
+
+async def handle_metrics(request):
+    metrics = {"single_flight": get_single_flight_metrics(), "gql_batching": get_gql_batcher(request.app[session_key]).get_metrics()}
+    if request.app[segment_cache_key] is not None:
+        metrics["segment_cache"] = request.app[segment_cache_key].get_metrics()
+    return web.json_response(metrics)
+
+
+async def client_session_context(app):
+    # one warm pool for every request the service makes upstream
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, keepalive_timeout=60, ttl_dns_cache=300)
+    app[session_key] = aiohttp.ClientSession(connector=connector)
+    yield
+    await app[session_key].close()
+
+
+def create_app():
+    app = web.Application()
+    app[templates_key] = read_public_templates()
+    app[playlist_cache_key] = {}
+    app[segment_cache_key] = get_segment_cache()
+    app.cleanup_ctx.append(client_session_context)
+    app.add_routes([
+        web.get("/", handle_index),
+        web.get(r"/videos/{video_id:\d+}", handle_video_page),
+        web.get(r"/videos/{video_id:\d+}/playlist.m3u8", handle_video_playlist),
+        web.get(r"/segments/{video_id:\d+}/{quality}/{segment_name}", handle_segment),
+        web.get(r"/api/videos/{video_id:\d+}", handle_video_json),
+        web.get(r"/api/videos/{video_id:\d+}/qualities", handle_video_qualities),
+        web.get("/metrics", handle_metrics),
+    ])
+    return app
+
+
+def run_server(port=SERVER_PORT):
+    web.run_app(create_app(), port=port, print=lambda _: print(f"Server started on port {port}", flush=True))
+
+
+# keep
+def twitch_recover(link=None):
+    # get it from python vod.py <url> argv
+    url = sys.argv[1]
+    pattern = r"twitch\.tv/(?:[^\/]+\/)?(\d+)"
+    match = re.search(pattern, url)
+    vod_id = match.group(1)
+    resolution = resolve_twitch_vod(vod_id)
+    url = resolution["m3u8_link"]
         
     print(f"\n\033[92m\u2713 before qualities: {url}\033[0m")
 
@@ -1310,7 +3241,12 @@ def twitch_recover(link=None):
 
 if __name__ == "__main__":
     try:
-        twitch_recover()
+        if len(sys.argv) > 2 and sys.argv[1] == "--batch":
+            asyncio.run(batch_vod_recover(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None))
+        elif len(sys.argv) > 1 and sys.argv[1] == "--serve":
+            run_server(int(sys.argv[2]) if len(sys.argv) > 2 else SERVER_PORT)
+        else:
+            twitch_recover()
     except KeyboardInterrupt:
         print("\n\nExiting...")
         sys.exit(0)
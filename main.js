@@ -12,13 +12,11 @@ const log = (data) => {
   console.log(`${new Date().toISOString()} ${data.toString()}`)
 }
 
-// const CACHE_PATH = __dirname + "cache.json"
-// let cache = {}
-
-// const pushCache = (key, value) => {
-//   cache[key] = value
-//   writeCacheToDisk()
-// }
+const CACHE_PATH = __dirname + "cache.json"
+const CACHE_TTL = 6 * 60 * 60 * 1000
+const CACHE_MAX_ENTRIES = 10000
+// Map keeps insertion order, re-inserting on read makes the first key the least recently used
+let cache = new Map()
 
 const debounce = (func, delay) => {
   let timer
@@ -28,31 +26,55 @@ const debounce = (func, delay) => {
   }
 }
 
-// const writeCacheToDisk = debounce(async () => {
-//   // write cache to disk
-//   return await fs.promises.writeFile(CACHE_PATH, JSON.stringify(cache, null, 2))
-// }, 4000)
+const writeCacheToDisk = debounce(async () => {
+  // write to a temp file and rename so a crash never leaves a truncated cache
+  const tmpPath = `${CACHE_PATH}.tmp`
+  await fs.promises.writeFile(
+    tmpPath,
+    JSON.stringify(Object.fromEntries(cache), null, 2)
+  )
+  await fs.promises.rename(tmpPath, CACHE_PATH)
+}, 4000)
 
-// const loadCacheFromDisk = async () => {
-//   try {
-//     const data = await fs.promises.readFile(CACHE_PATH)
-//     cache = JSON.parse(data)
-//   } catch (e) {
-//     console.error(e)
-//   }
-// }
+const loadCacheFromDisk = async () => {
+  try {
+    const data = await fs.promises.readFile(CACHE_PATH)
+    cache = new Map(
+      Object.entries(JSON.parse(data)).filter(
+        ([, entry]) => entry.expiresAt >= Date.now()
+      )
+    )
+  } catch (e) {
+    if (e.code !== "ENOENT") console.error(e)
+  }
+}
+
+const readCache = (key) => {
+  const entry = cache.get(key)
+  if (!entry) return
+  cache.delete(key)
+  if (entry.expiresAt < Date.now()) return
+  cache.set(key, entry)
+  return entry
+}
+
+const pushCache = (key, value) => {
+  cache.delete(key)
+  cache.set(key, { ...value, expiresAt: Date.now() + CACHE_TTL })
+  while (cache.size > CACHE_MAX_ENTRIES) {
+    cache.delete(cache.keys().next().value)
+  }
+  writeCacheToDisk()
+}
 
 const getUrl = (id) => {
   return new Promise(async (resolve, reject) => {
-    // if (cache[id]) {
-    //   if (cache[id].expiresAt < Date.now()) {
-    //     delete cache[id]
-    //   } else {
-    //     log(`served from cache: ${cache[id]}`)
-    //     resolve(cache[id].url)
-    //     return
-    //   }
-    // }
+    const cached = readCache(id)
+    if (cached) {
+      log(`served from cache: ${cached.url}`)
+      resolve(cached.url)
+      return
+    }
 
     const { data } = await axios.post(
       "https://gql.twitch.tv/gql",
@@ -78,10 +100,14 @@ const getUrl = (id) => {
       paths[paths.indexOf(paths.find((i) => i.includes("storyboards"))) - 1]
     const url = `https://${domain}/${vodSpecialId}/chunked/index-dvr.m3u8`
     console.log(`Found: ${url}`)
+    pushCache(id, {
+      url,
+      title: vodData.title,
+      broadcastType: vodData.broadcastType,
+      createdAt: vodData.createdAt,
+      owner: vodData.owner?.login,
+    })
     resolve(url)
-
-    // cache[id] = m3u8Url
-    // writeCacheToDisk()
   })
 }
 
@@ -140,7 +166,7 @@ app.get("/videos/:id", async (req, res) => {
 // res.json(cache)
 // })
 
-// await loadCacheFromDisk()
+await loadCacheFromDisk()
 
 const SERVER_PORT = 7359
 app.listen(SERVER_PORT, () => {